@@ -1,6 +1,5 @@
 ## Import basic python functions
 import os
-import pandas as pd
 ## Import dtk and EMOD basics functionalities
 from dtk.utils.core.DTKConfigBuilder import DTKConfigBuilder
 from dtk.vector.species import set_species, set_larval_habitat
@@ -13,23 +12,30 @@ from malaria.reports.MalariaReport import add_event_counter_report
 ## Import campaign functions
 from dtk.interventions.itn import add_ITN
 from malaria.interventions.health_seeking import add_health_seeking
-from simtools.Utilities.Experiments import retrieve_experiment
+from burnin_index import BurninIndex, state_filename
+from serialized_states import StateCatalog
 
 SetupParser.default_block = 'HPC'
 burnin_id = "24111752-ecd9-ec11-a9f8-b88303911bc1"  # UPDATE with burn-in experiment id
 pull_year = 20  # year of burn-in to pick-up from
 pickup_years = 2  # years of pick-up to run
 numseeds = 5
-sim_start_year = 2000 + pull_year
+# True: if a burn-in simulation has no state at the end of pull_year, pick up from the nearest year end saved by all
+# of them instead of failing
+use_nearest_state = False
 
 SetupParser.init()
 cb = DTKConfigBuilder.from_defaults('MALARIA_SIM', Simulation_Duration=pickup_years * 365)
 
-expt = retrieve_experiment(burnin_id)  # Identifies the desired burn-in experiment
-
-# Loop through unique "tags" to distinguish between burn-in scenarios (ex. varied historical coverage levels)
-ser_df = pd.DataFrame([x.tags for x in expt.simulations])
-ser_df["outpath"] = pd.Series([sim.get_path() for sim in expt.simulations])
+# Index the burn-in simulations by their "tags" to distinguish between burn-in scenarios (ex. varied historical
+# coverage levels), and check that all of them saved their state in pull_year
+burnin_index = BurninIndex(burnin_id, key_tags=['Run_Number'])
+if use_nearest_state:
+    pull_year = StateCatalog(burnin_index, checksum=False).nearest_day(pull_year * 365, step=365) // 365
+else:
+    burnin_index.validate(pull_year)
+# dates of the pick-up follow the burn-in year actually picked up from
+sim_start_year = 2000 + pull_year
 
 cb.update_params({
     'Demographics_Filenames': [os.path.join('Namawala', 'Namawala_single_node_demographics_wIP.json')],
@@ -40,7 +46,7 @@ cb.update_params({
 
 cb.update_params({
     'Serialized_Population_Reading_Type': 'READ',
-    'Serialized_Population_Filenames': ['state-%05d.dtk' % (pull_year * 365)],
+    'Serialized_Population_Filenames': [state_filename(pull_year)],
     'Enable_Random_Generator_From_Serialized_Population': 0,
     'Serialization_Mask_Node_Read': 0,
     'Enable_Default_Reporting': 1,
@@ -190,7 +196,7 @@ for i in range(pickup_years):
 builder = ModBuilder.from_list([[ModFn(case_management, cm_cov_U5),
                                  ModFn(itn_intervention, itn_cov),
                                  ModFn(DTKConfigBuilder.set_param, 'Serialized_Population_Path',
-                                       os.path.join(ser_df[ser_df.Run_Number == seed].outpath.iloc[0], 'output')),
+                                       burnin_index.path(Run_Number=seed)),
                                  ModFn(DTKConfigBuilder.set_param, 'Run_Number', seed)]
                                 # Run pick-up from each unique burn-in scenario
                                 for cm_cov_U5 in [0.6]
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+"""
+Adaptive sampling of one parameter (e.g. itn_coverage) over rounds of simulations, as an alternative to a fixed grid.
+Each round is scored per run (select_w7.score_runs), and the next round is proposed from all scores so far:
+ - contenders: values whose mean log-likelihood is within tolerance standard errors of the best value
+ - refine: new values halfway between each contender and its evaluated neighbours (on a grid of resolution)
+ - seeds: contenders get extra_seeds more runs (up to max_seeds) to separate them from the best value
+Sampling stops when a round proposes no runs, i.e. the grid around the contenders cannot be refined further and
+the contenders have max_seeds runs. See run_adaptive_w7.py for the driver.
+"""
+
+
+def initial_round(values, seeds, variable):
+    """Runs (variable, Run_Number) of a first, coarse grid"""
+    return pd.DataFrame([{variable: value, 'Run_Number': seed} for value in values for seed in range(seeds)])
+
+
+def value_summary(run_scores, variable):
+    """Mean log-likelihood, its standard error and the number of runs per value"""
+    stats = run_scores.groupby(variable)['ll'].agg(['mean', 'std', 'count']).reset_index()
+    stats['se'] = (stats['std'] / np.sqrt(stats['count'])).fillna(0)
+    return stats.sort_values(variable).reset_index(drop=True)
+
+
+def contenders(stats, tolerance=2):
+    """Values not distinguishable from the best one: mean + tolerance*se reaches the best mean - tolerance*se"""
+    best = stats.loc[stats['mean'].idxmax()]
+    return stats[stats['mean'] + tolerance * stats['se'] >= best['mean'] - tolerance * best['se']]
+
+
+def refine_values(values, centers, bounds=(0, 1), resolution=0.01):
+    """New values halfway between each center and its neighbours among values, on a grid of resolution"""
+    values = np.sort(np.asarray(values, dtype=float))
+    spacing = np.diff(values).min() if len(values) > 1 else (bounds[1] - bounds[0]) / 4
+    candidates = []
+    for center in centers:
+        i = np.searchsorted(values, center)
+        lower = values[i - 1] if i > 0 else center - spacing
+        upper = values[i + 1] if i < len(values) - 1 else center + spacing
+        candidates += [(lower + center) / 2, (center + upper) / 2]
+    candidates = np.clip(np.round(np.array(candidates) / resolution) * resolution, *bounds)
+    candidates = np.unique(np.round(candidates, 10))
+    return [float(x) for x in candidates if not np.isclose(values, x).any()]
+
+
+def propose_round(run_scores, variable, bounds=(0, 1), resolution=0.01, tolerance=2, seeds=5, extra_seeds=5,
+                  max_seeds=20):
+    """Runs (variable, Run_Number) of the next round from the per-run scores of all previous rounds.
+    New values get seeds runs, contenders extra_seeds runs with new Run_Numbers (at most max_seeds in total)"""
+    run_scores = run_scores.dropna(subset=['ll'])
+    stats = value_summary(run_scores, variable)
+    close = contenders(stats, tolerance)
+
+    rows = []
+    for value in refine_values(stats[variable], close[variable], bounds, resolution):
+        rows += [{variable: value, 'Run_Number': seed} for seed in range(seeds)]
+    if len(close) > 1:
+        for _, row in close.iterrows():
+            first_seed = run_scores.loc[run_scores[variable] == row[variable], 'Run_Number'].max() + 1
+            n_seeds = min(extra_seeds, max_seeds - int(row['count']))
+            rows += [{variable: row[variable], 'Run_Number': first_seed + i} for i in range(max(n_seeds, 0))]
+    return pd.DataFrame(rows, columns=[variable, 'Run_Number'])
+
+
+def make_builder(runs, variable, run_mods):
+    """ModBuilder of the runs of a round, run_mods(value, seed) returns the list of ModFn of one simulation"""
+    from simtools.ModBuilder import ModBuilder
+    return ModBuilder.from_list([run_mods(value, int(seed)) for value, seed in zip(runs[variable], runs['Run_Number'])])
@@ -5,46 +5,71 @@ import numpy as np
 
 ## Script from https://github.com/InstituteforDiseaseModeling/malaria-toolbox/blob/master/input_file_generation/add_properties_to_demographics.py
 
-def check_df_valid(df, IPs, NPs) :
-
-    # also check that values are listed in NPs and IPs?
-    def check_prop_specified(sdf, prop_list, prop_type):
-        p_list = [x['Property'] for x in prop_list]
-        valid = all(x in p_list for x in sdf[sdf['Property_Type'] == prop_type]['Property'].unique())
-        if not valid:
-            print('invalid %s' % prop_type)
-            return False
-        return True
-
-    def check_prop_vals_specified(sdf, prop_list, prop_type):
-        for p, gdf in sdf[sdf['Property_Type'] == prop_type].groupby('Property'):
-            df_vals = gdf['Property_Value'].unique()
-            for item in prop_list:
-                if item['Property'] == p and not all(x in item['Values'] for x in df_vals):
-                    print('invalid value for %s %s' % (prop_type, p))
-                    return False
-        return True
-
-    # check all NPs specified in defaults
-    if not check_prop_specified(df, NPs, 'NP') :
-        return False
-    # check all NP values specified in defaults
-    if not check_prop_vals_specified(df, NPs, 'NP') :
-        return False
-
-    # check all IPs specified in defaults
-    if not check_prop_specified(df, IPs, 'IP') :
-        return False
-    # check all IP values specified in defaults
-    if not check_prop_vals_specified(df, IPs, 'IP') :
-        return False
-
-    # check all IP initial distributions sum to 1
-    for (nodeid, prop), gdf in df[df['Property_Type'] == 'IP'].groupby(['node', 'Property']):
-        if np.sum(gdf['Initial_Distribution']) != 1 :
-            print('Node %d, IP %s initial distribution invalid' % (nodeid, prop))
-            return False
-    return True
+def property_table_issues(df, IPs, NPs, tol=1e-6):
+    """All violations of a property table (node, Property_Type, Property, Property_Value, Initial_Distribution)
+    against the declared IPs and NPs, one row per violation (check, Property_Type, Property, Property_Value, node,
+    message): properties and property values not declared, and IP initial distributions of a node not summing to 1
+    (within tol)"""
+    columns = ['check', 'Property_Type', 'Property', 'Property_Value', 'node', 'message']
+    declared = pd.DataFrame([(prop_type, item['Property'], value)
+                             for prop_type, prop_list in [('IP', IPs), ('NP', NPs)]
+                             for item in prop_list for value in item['Values']],
+                            columns=['Property_Type', 'Property', 'Property_Value'], dtype=object)
+    used = df.loc[df['Property_Type'].isin(['IP', 'NP']), ['Property_Type', 'Property', 'Property_Value']]
+    used = used.drop_duplicates().astype(object)
+
+    # properties and values not declared
+    props = used[['Property_Type', 'Property']].drop_duplicates().merge(
+        declared[['Property_Type', 'Property']].drop_duplicates(), how='left', indicator=True)
+    props = props[props['_merge'] == 'left_only'].drop(columns='_merge')
+    values = used.merge(declared, how='left', indicator=True)
+    values = values[values['_merge'] == 'left_only'].drop(columns='_merge')
+    values = values.merge(props, how='left', indicator=True)
+    values = values[values['_merge'] == 'left_only'].drop(columns='_merge')
+    props = props.assign(check='undeclared_property', Property_Value=None, node=None,
+                         message=[f'{t} {p} not declared' for t, p in zip(props['Property_Type'], props['Property'])])
+    values = values.assign(check='undeclared_value', node=None,
+                           message=[f'Value {v} of {t} {p} not declared' for t, p, v in
+                                    zip(values['Property_Type'], values['Property'], values['Property_Value'])])
+
+    # IP initial distributions, NaN values make the distribution invalid
+    ip_df = df[df['Property_Type'] == 'IP']
+    sums = ip_df.assign(missing=ip_df['Initial_Distribution'].isna()).groupby(['node', 'Property']).agg(
+        total=('Initial_Distribution', 'sum'), missing=('missing', 'any')).reset_index()
+    sums = sums[sums['missing'] | ((sums['total'] - 1).abs() > tol)]
+    sums = sums.assign(check='distribution_sum', Property_Type='IP', Property_Value=None,
+                       message=[f'Node {n}, IP {p} initial distribution '
+                                + ('has missing values' if m else f'sums to {t}')
+                                for n, p, t, m in zip(sums['node'], sums['Property'], sums['total'], sums['missing'])])
+
+    frames = [x[columns] for x in [props, values, sums] if len(x)]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def check_df_valid(df, IPs, NPs, tol=1e-6) :
+    """Print all violations of the property table (see property_table_issues) and return whether it is valid"""
+    issues = property_table_issues(df, IPs, NPs, tol)
+    for message in issues['message']:
+        print(message)
+    return issues.empty
+
+
+def _node_index(nodes):
+    """NodeID -> nodes with this NodeID"""
+    index = {}
+    for node in nodes:
+        index.setdefault(node['NodeID'], []).append(node)
+    return index
+
+
+def _group_rows(keys, values):
+    """values grouped by key, keys in order of first appearance"""
+    groups = {}
+    for key, value in zip(keys, values):
+        groups.setdefault(key, []).append(value)
+    return groups.items()
 
 
 def generate_demographics_properties(refdemo_fname, output_filename='',
@@ -73,46 +98,53 @@ def generate_demographics_properties(refdemo_fname, output_filename='',
             demo['NodeProperties'] = NPs
 
     if as_overlay:
-        nodeIDs_existing = []
+        nodeIDs_existing = set()
         demo['Nodes'] = []
     elif not df.empty:
-        nodeIDs_existing = df['node'].unique()
+        nodeIDs_existing = set(df['node'].unique())
+    node_index = _node_index(demo.get('Nodes', []))
+
+    def add_node(node):
+        demo['Nodes'].append(node)
+        node_index[node['NodeID']] = [node]
+        nodeIDs_existing.add(node['NodeID'])
 
     if not df.empty and 'NP' in df['Property_Type'].unique() :
         for NP in df[df['Property_Type'] == 'NP']['Property'].unique():
-            for i, row in df[df['Property'] == NP].iterrows():
-                this_np = '%s:%s' % (row['Property'], row['Property_Value'])
-                if row['node'] not in nodeIDs_existing:
-                    demo['Nodes'].append({'NodeID': row['node'],
-                                          'NodeAttributes': {
-                                              'NodePropertyValues': [this_np]
-                                          }})
-                    nodeIDs_existing.append(row['node'])
+            np_df = df[df['Property'] == NP]
+            values = ['%s:%s' % (prop, value) for prop, value in zip(np_df['Property'], np_df['Property_Value'])]
+            # all values of a node are added at once
+            for nodeid, node_nps in _group_rows(np_df['node'].to_numpy(), values):
+                if nodeid not in nodeIDs_existing:
+                    add_node({'NodeID': nodeid,
+                              'NodeAttributes': {
+                                  'NodePropertyValues': node_nps
+                              }})
                 else:
-                    for node in demo['Nodes']:
-                        if node['NodeID'] == row['node']:
-                            if 'NodePropertyValues' not in node['NodeAttributes']:
-                                node['NodeAttributes']['NodePropertyValues'] = [this_np]
-                            else:
-                                node['NodeAttributes']['NodePropertyValues'].append(this_np)
+                    for node in node_index.get(nodeid, []):
+                        node['NodeAttributes'].setdefault('NodePropertyValues', []).extend(node_nps)
 
     if not df.empty and 'IP' in df['Property_Type'].unique() :
-        for (nodeid, prop), gdf in df[df['Property_Type'] == 'IP'].groupby(['node', 'Property']):
-            this_ip = {'Property': prop,
-                       'Values': list(gdf['Property_Value'].values),
-                       'Initial_Distribution': list([float(x) for x in gdf['Initial_Distribution'].values])}
+        # rows of each (node, Property) made consecutive, in the order of groupby(['node', 'Property'])
+        ip_df = df[df['Property_Type'] == 'IP'].dropna(subset=['node', 'Property'])
+        ip_df = ip_df.sort_values(['node', 'Property'], kind='stable')
+        nodeids, props = ip_df['node'].to_numpy(), ip_df['Property'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, (nodeids[1:] != nodeids[:-1]) | (props[1:] != props[:-1])])
+        ends = np.r_[starts[1:], len(ip_df)]
+        values = ip_df['Property_Value'].to_numpy()
+        distributions = ip_df['Initial_Distribution'].to_numpy()
+        for start, end in zip(starts, ends):
+            nodeid = nodeids[start]
+            this_ip = {'Property': props[start],
+                       'Values': list(values[start:end]),
+                       'Initial_Distribution': [float(x) for x in distributions[start:end]]}
             if nodeid not in nodeIDs_existing:
-                demo['Nodes'].append({'NodeID': int(nodeid),
-                                      'IndividualProperties': [this_ip]
-                                      })
-                nodeIDs_existing.append(nodeid)
+                add_node({'NodeID': int(nodeid),
+                          'IndividualProperties': [this_ip]
+                          })
             else:
-                for node in demo['Nodes']:
-                    if node['NodeID'] == nodeid:
-                        if 'IndividualProperties' not in node:
-                            node['IndividualProperties'] = [this_ip]
-                        else:
-                            node['IndividualProperties'].append(this_ip)
+                for node in node_index.get(nodeid, []):
+                    node.setdefault('IndividualProperties', []).append(this_ip)
 
     if as_overlay and not df.empty :
         missing_nodeids = [x for x in all_nodeids if x not in nodeIDs_existing]
@@ -125,4 +157,3 @@ def generate_demographics_properties(refdemo_fname, output_filename='',
 
     with open(output_filename, 'w') as fout:
         json.dump(demo, fout, sort_keys=True, indent=4, separators=(',', ': '), default=default)
-
@@ -2,6 +2,9 @@ from simtools.Analysis.AnalyzeManager import AnalyzeManager
 from simtools.SetupParser import SetupParser
 
 from analyzer_collection import *
+from sim_calendar import month_start_date, day_date
+from result_cache import CachedAnalyzer
+from table_io import read_table
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 
@@ -16,8 +19,7 @@ working_dir = os.path.join(os.getcwd(), 'simulation_outputs')
 
 def plot_inset_chart(channels_inset_chart, sweep_variables):
     # read in analyzed InsetChart data
-    df = pd.read_csv(os.path.join(working_dir, expt_name, 'All_Age_InsetChart.csv'))
-    df['date'] = pd.to_datetime(df['date'])
+    df = read_table(os.path.join(working_dir, expt_name, 'All_Age_InsetChart.csv'))
     df = df.groupby(['date'] + sweep_variables)[channels_inset_chart].agg(np.mean).reset_index()
 
     # make InsetChart plot
@@ -43,12 +45,12 @@ def plot_summary_report(sweep_variables, ip_name, ipfilter):
 
     df = pd.DataFrame()
     for ipf in ipfilter:
-        g = pd.read_csv(os.path.join(working_dir, expt_name, f'U5{ipf}_PfPR_ClinicalIncidence.csv'))
+        g = read_table(os.path.join(working_dir, expt_name, f'U5{ipf}_PfPR_ClinicalIncidence.csv'))
         g.columns = [col.replace(' U5', '') for col in g.columns]
         g[ip_name] = ipf.replace('_', '')
         df = pd.concat([g, df])
 
-    df['date'] = df.apply(lambda x: datetime.date(int(x['year']), int(x['month']), 1), axis=1)
+    df['date'] = month_start_date(df['year'], df['month'])
 
     # take mean over all Runs in report
     df = df.groupby(['date', 'month', 'year'] + sweep_variables + [ip_name])[channels_summary_report].agg(
@@ -77,12 +79,12 @@ def plot_summary_report(sweep_variables, ip_name, ipfilter):
 
 def plot_individual_events(event_list, ip_name, sweep_variables):
     # read in analyzed event data
-    df = pd.read_csv(os.path.join(working_dir, expt_name, 'IndividualEvents_all_years.csv'))
+    df = read_table(os.path.join(working_dir, expt_name, 'IndividualEvents_all_years.csv'))
     df = df.loc[df['Event_Name'].isin(event_list)]
 
     ## Filter to last year of simulation and one seed to reduce output
     # df = df.loc[df['Time'] >= max(df['Time']) - 365]
-    df['date'] = df.apply(lambda x: datetime.date(int(x['Year']), 1, 1) + datetime.timedelta(x['Day'] - 1), axis=1)
+    df['date'] = day_date(df['Year'], df['Day'])
 
     # 'date'
     adf = df.groupby(['Event_Name', 'Run_Number', ip_name] + sweep_variables)[['Individual_ID']].agg(
@@ -125,28 +127,20 @@ if __name__ == "__main__":
                            working_dir=working_dir,
                            channels=channels_inset_chart,
                            sweep_variables=sweep_variables),
+        # all ages and each IP filter in one pass
         MonthlyPfPRAnalyzerU5(expt_name=expt_name,
                               working_dir=working_dir,
                               start_year=start_year,
                               end_year=start_year + 1,
-                              sweep_variables=sweep_variables),
-        MonthlyPfPRAnalyzerU5IP(expt_name=expt_name,
-                                working_dir=working_dir,
-                                start_year=start_year,
-                                end_year=start_year + 1,
-                                sweep_variables=sweep_variables,
-                                ipfilter='_accesslow'),
-        MonthlyPfPRAnalyzerU5IP(expt_name=expt_name,
-                                working_dir=working_dir,
-                                start_year=start_year,
-                                end_year=start_year + 1,
-                                sweep_variables=sweep_variables,
-                                ipfilter='_accesshigh'),
+                              sweep_variables=sweep_variables,
+                              ipfilters=[''] + ipfilter),
         IndividualEventsAnalyzer(expt_name=expt_name,
                                  working_dir=working_dir,
                                  start_year=start_year,
                                  sweep_variables=sweep_variables)
     ]
+    # re-use results of simulations analyzed before (remove simulation_outputs/.analyzer_cache to start over)
+    analyzers = [CachedAnalyzer(analyzer, expt_id) for analyzer in analyzers]
     am = AnalyzeManager(expt_id, analyzers=analyzers)
     am.analyze()
 
@@ -1,8 +1,15 @@
 import os
-import datetime
+import shutil
 import pandas as pd
 import numpy as np
 from simtools.Analysis.BaseAnalyzers import BaseAnalyzer
+from sim_calendar import DAYS_PER_YEAR, add_calendar_columns, day_of_year, month_of_day, month_start_date
+from summary_report import AGEBIN_CHANNELS, summary_report_frame
+from output_cache import output_cache
+from table_io import write_table, read_table, table_exists
+from sweep_tags import add_sweep_tags, concat_tagged
+from running_aggregate import RunningAggregate
+from experiment_store import store_simulations
 
 """
 InsetChart Analyzer
@@ -11,34 +18,25 @@ InsetChart Analyzer
 
 class InsetChartAnalyzer(BaseAnalyzer):
 
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
-
-    def __init__(self, expt_name, sweep_variables=None, channels=None, working_dir=".", start_year=2022):
-        super(InsetChartAnalyzer, self).__init__(working_dir=working_dir, filenames=["output/InsetChart.json"])
+    def __init__(self, expt_name, sweep_variables=None, channels=None, working_dir=".", start_year=2022,
+                 output_format='csv', store=False):
+        # parse=False: only the selected channels are read from the raw file (output_cache)
+        super(InsetChartAnalyzer, self).__init__(working_dir=working_dir, filenames=["output/InsetChart.json"],
+                                                 parse=False)
         self.sweep_variables = sweep_variables or ["Run_Number"]
         self.inset_channels = channels or ['Statistical Population', 'New Clinical Cases', 'New Severe Cases',
                                            'PfHRP2 Prevalence']
         self.expt_name = expt_name
+        self.output_format = output_format
+        self.store = store
         self.start_year = start_year
 
     def select_simulation_data(self, data, simulation):
-        simdata = pd.DataFrame({x: data[self.filenames[0]]['Channels'][x]['Data'] for x in self.inset_channels})
+        simdata = output_cache.channel_frame(data, simulation, self.filenames[0], self.inset_channels)
         simdata['Time'] = simdata.index
-        simdata['Day'] = simdata['Time'] % 365
-        simdata['Year'] = simdata['Time'].apply(lambda x: int(x / 365) + self.start_year)
-        simdata['date'] = simdata.apply(
-            lambda x: datetime.date(int(x['Year']), 1, 1) + datetime.timedelta(int(x['Day']) - 1), axis=1)
-
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                simdata[sweep_var] = simulation.tags[sweep_var]
-            elif sweep_var == 'Run_Number' :
-                simdata[sweep_var] = 0
+        add_calendar_columns(simdata, self.start_year, month_col=None, date='day')
+
+        add_sweep_tags(simdata, simulation, self.sweep_variables)
         return simdata
 
     def finalize(self, all_data):
@@ -47,12 +45,14 @@ class InsetChartAnalyzer(BaseAnalyzer):
         if len(selected) == 0:
             print("No data have been returned... Exiting...")
             return
+        store_simulations(self, all_data.keys())
 
         if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
             os.mkdir(os.path.join(self.working_dir, self.expt_name))
 
-        adf = pd.concat(selected).reset_index(drop=True)
-        adf.to_csv(os.path.join(self.working_dir, self.expt_name, 'All_Age_InsetChart.csv'), index=False)
+        adf = concat_tagged(selected).reset_index(drop=True)
+        write_table(adf, os.path.join(self.working_dir, self.expt_name, 'All_Age_InsetChart.csv'),
+                    self.output_format, self.sweep_variables, store=self.store)
 
 
 """
@@ -64,52 +64,29 @@ MalariaSummaryReport Analyzer
 class AnnualAgebinPfPRAnalyzer(BaseAnalyzer):
 
     def __init__(self, expt_name, sweep_variables=None, working_dir='./', start_year=2022,
-                 end_year=2025, burnin=None):
+                 end_year=2025, burnin=None, output_format='csv', store=False):
 
         super(AnnualAgebinPfPRAnalyzer, self).__init__(working_dir=working_dir,
                                                        filenames=[
                                                            f"output/MalariaSummaryReport_Annual_Agebin.json"])
         self.sweep_variables = sweep_variables or ["Run_Number"]
         self.expt_name = expt_name
+        self.output_format = output_format
+        self.store = store
         self.start_year = start_year
         self.end_year = end_year
         self.burnin = burnin
 
     def select_simulation_data(self, data, simulation):
 
-        adf = pd.DataFrame()
-
         nyears = (self.end_year - self.start_year)
-        age_bins = data[self.filenames[0]]['Metadata']['Age Bins']
-        pfpr2to10 = data[self.filenames[0]]['DataByTime']['PfPR_2to10'][:nyears]
-
-        for age in range(len(age_bins)):
-            d = data[self.filenames[0]]['DataByTimeAndAgeBins']['PfPR by Age Bin'][:nyears]
-            pfpr = [x[age] for x in d]
-            d = data[self.filenames[0]]['DataByTimeAndAgeBins']['Annual Clinical Incidence by Age Bin'][:nyears]
-            clinical_cases = [x[age] for x in d]
-            d = data[self.filenames[0]]['DataByTimeAndAgeBins']['Annual Severe Incidence by Age Bin'][:nyears]
-            severe_cases = [x[age] for x in d]
-            d = data[self.filenames[0]]['DataByTimeAndAgeBins']['Average Population by Age Bin'][:nyears]
-            pop = [x[age] for x in d]
-
-            simdata = pd.DataFrame({'year': range(self.start_year, self.end_year),
-                                    'PfPR': pfpr,
-                                    'Cases': clinical_cases,
-                                    'Severe cases': severe_cases,
-                                    'Pop': pop})
-            simdata['agebin'] = age_bins[age]
-            simdata['pfpr2to10'] = pfpr2to10
-            adf = pd.concat([adf, simdata])
-
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                try:
-                    adf[sweep_var] = simulation.tags[sweep_var]
-                except:
-                    adf[sweep_var] = '-'.join([str(x) for x in simulation.tags[sweep_var]])
-            elif sweep_var == 'Run_Number' :
-                adf[sweep_var] = 0
+        channels = {x: AGEBIN_CHANNELS[x] for x in ['PfPR', 'Cases', 'Severe cases', 'Pop']}
+        adf = summary_report_frame([data[self.filenames[0]]], channels, n_time=nyears,
+                                   time_col='year', time_values=range(self.start_year, self.end_year),
+                                   time_channels={'pfpr2to10': 'PfPR_2to10'})
+        adf = adf[['year'] + list(channels.keys()) + ['agebin', 'pfpr2to10']]
+
+        add_sweep_tags(adf, simulation, self.sweep_variables)
 
         return adf
 
@@ -119,7 +96,8 @@ class AnnualAgebinPfPRAnalyzer(BaseAnalyzer):
         if len(selected) == 0:
             print("\nWarning: No data have been returned... Exiting...")
             return
-        adf = pd.concat(selected).reset_index(drop=True)
+        store_simulations(self, all_data.keys())
+        adf = concat_tagged(selected).reset_index(drop=True)
 
         if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
             os.mkdir(os.path.join(self.working_dir, self.expt_name))
@@ -130,121 +108,44 @@ class AnnualAgebinPfPRAnalyzer(BaseAnalyzer):
         if self.burnin is not None:
             adf = adf[adf['year'] >= self.start_year + self.burnin]
         adf = adf.loc[adf['agebin'] <= 100]
-        adf.to_csv(os.path.join(self.working_dir, self.expt_name, 'Agebin_PfPR_ClinicalIncidence_annual.csv'), index=False)
-
-
-# MonthlyAgebinPfPRAnalyzer
-class MonthlyAgebinPfPRAnalyzer(BaseAnalyzer):
-
-    def __init__(self, expt_name, sweep_variables=None, working_dir='./', start_year=2020,
-                 end_year=2023,
-                 burnin=None, filter_exists=False):
-
-        super(MonthlyAgebinPfPRAnalyzer, self).__init__(working_dir=working_dir,
-                                                        filenames=[
-                                                            f"output/MalariaSummaryReport_Monthly_Agebin_{x}.json"
-                                                            for x in range(start_year, end_year)]
-                                                        )
-        self.sweep_variables = sweep_variables or ["Run_Number"]
-        self.expt_name = expt_name
-        self.start_year = start_year
-        self.end_year = end_year
-        self.burnin = burnin
-        self.filter_exists = filter_exists
-
-    def filter(self, simulation):
-        if self.filter_exists:
-            file = os.path.join(simulation.get_path(), self.filenames[0])
-            return os.path.exists(file)
-        else:
-            return True
-
-    def select_simulation_data(self, data, simulation):
-
-        adf = pd.DataFrame()
-        for year, fname in zip(range(self.start_year, self.end_year), self.filenames):
-
-            age_bins = data[fname]['Metadata']['Age Bins']
-
-            for age in list(range(0, len(age_bins))):
-                d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin'][:12]
-                pfpr = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['Annual Clinical Incidence by Age Bin'][:12]
-                clinical_cases = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['Annual Severe Incidence by Age Bin'][:12]
-                severe_cases = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['Annual Mild Anemia by Age Bin'][:12]
-                mild_anaemia = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['Annual Moderate Anemia by Age Bin'][:12]
-                moderate_anaemia = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['Annual Severe Anemia by Age Bin'][:12]
-                severe_anaemia = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['Average Population by Age Bin'][:12]
-                pop = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['New Infections by Age Bin'][:12]
-                new_infect = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['Mean Log Parasite Density by Age Bin'][:12]
-                log_parasite_density = [x[age] for x in d]
-
-                simdata = pd.DataFrame({'month': range(1, 13),
-                                        'PfPR': pfpr,
-                                        'Cases': clinical_cases,
-                                        'Severe cases': severe_cases,
-                                        'Mild anaemia': mild_anaemia,
-                                        'Moderate anaemia': moderate_anaemia,
-                                        'Severe anaemia': severe_anaemia,
-                                        'New infections': new_infect,
-                                        'Mean Log Parasite Density': log_parasite_density,
-                                        'Pop': pop})
-                simdata['year'] = year
-                simdata['agebin'] = age_bins[age]
-                adf = pd.concat([adf, simdata])
-
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                try:
-                    adf[sweep_var] = simulation.tags[sweep_var]
-                except:
-                    adf[sweep_var] = '-'.join([str(x) for x in simulation.tags[sweep_var]])
-            elif sweep_var == 'Run_Number' :
-                adf[sweep_var] = 0
-
-        return adf
-
-    def finalize(self, all_data):
+        write_table(adf, os.path.join(self.working_dir, self.expt_name, 'Agebin_PfPR_ClinicalIncidence_annual.csv'),
+                    self.output_format, self.sweep_variables, store=self.store)
 
-        selected = [data for sim, data in all_data.items()]
-        if len(selected) == 0:
-            print("\nWarning: No data have been returned... Exiting...")
-            return
-        df = pd.concat(selected).reset_index(drop=True)
 
-        if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
-            os.mkdir(os.path.join(self.working_dir, self.expt_name))
+# SummaryReportAnalyzer
+class SummaryReportAnalyzer(BaseAnalyzer):
+    """Configurable analyzer for yearly MalariaSummaryReport files named
+    output/MalariaSummaryReport_{report_name}{ipfilter}_{year}.json.
+    All IP filters are read in one pass and each writes its own csv file (output_fname with '{ipfilter}').
+    channels map output column names to 'DataByTimeAndAgeBins' channels, time_channels to 'DataByTime' channels,
+    bins selects age bin indices (default all) and agebin_col=None drops the age bin column."""
 
-        print(f'\nSaving outputs to: {os.path.join(self.working_dir, self.expt_name)}')
+    intervals = {'monthly': ('month', 12), 'weekly': ('week', 52)}
 
-        if self.burnin is not None:
-            df = df[df['year'] > self.start_year + self.burnin]
-        df = df.loc[df['agebin'] < 100]  # less than 100 years
-        df.to_csv((os.path.join(self.working_dir, self.expt_name, f'Agebin_PfPR_ClinicalIncidence.csv')),
-                  index=False)
-
-
-### PER AGE GROUP
-# MonthlyPfPRAnalyzerU5
-class MonthlyPfPRAnalyzerU5(BaseAnalyzer):
-
-    def __init__(self, expt_name, sweep_variables=None, working_dir='./', start_year=2020, end_year=2023,
-                 burnin=None, filter_exists=False):
+    def __init__(self, expt_name, report_name, output_fname, channels=None, time_channels=None, bins=None,
+                 agebin_col='agebin', agebin_max=None, interval='monthly', ipfilters=None, sweep_variables=None,
+                 working_dir='./', start_year=2020, end_year=2023, burnin=None, filter_exists=False,
+                 output_format='csv', store=False):
 
-        super(MonthlyPfPRAnalyzerU5, self).__init__(working_dir=working_dir,
+        self.ipfilters = ipfilters or ['']
+        super(SummaryReportAnalyzer, self).__init__(working_dir=working_dir,
                                                     filenames=[
-                                                        f"output/MalariaSummaryReport_Monthly_U5_{x}.json"
+                                                        f"output/MalariaSummaryReport_{report_name}{ipf}_{x}.json"
+                                                        for ipf in self.ipfilters
                                                         for x in range(start_year, end_year)]
                                                     )
         self.sweep_variables = sweep_variables or ["Run_Number"]
         self.expt_name = expt_name
+        self.output_format = output_format
+        self.store = store
+        self.report_name = report_name
+        self.output_fname = output_fname
+        self.channels = channels or AGEBIN_CHANNELS
+        self.time_channels = time_channels
+        self.bins = bins
+        self.agebin_col = agebin_col
+        self.agebin_max = agebin_max
+        self.time_col, self.n_time = self.intervals[interval]
         self.start_year = start_year
         self.end_year = end_year
         self.burnin = burnin
@@ -259,40 +160,19 @@ class MonthlyPfPRAnalyzerU5(BaseAnalyzer):
 
     def select_simulation_data(self, data, simulation):
 
-        adf = pd.DataFrame()
-        for year, fname in zip(range(self.start_year, self.end_year), self.filenames):
-            d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin'][:12]
-            pfpr = [x[1] for x in d]
-            d = data[fname]['DataByTimeAndAgeBins']['Annual Clinical Incidence by Age Bin'][:12]
-            clinical_cases = [x[1] for x in d]
-            d = data[fname]['DataByTimeAndAgeBins']['Annual Severe Incidence by Age Bin'][:12]
-            severe_cases = [x[1] for x in d]
-            d = data[fname]['DataByTimeAndAgeBins']['Average Population by Age Bin'][:12]
-            pop = [x[1] for x in d]
-            d = data[fname]['DataByTime']['PfPR_2to10'][:12]
-            PfPR_2to10 = d
-            d = data[fname]['DataByTime']['Annual EIR'][:12]
-            annualeir = d
-            simdata = pd.DataFrame({'month': range(1, 13),
-                                    'PfPR U5': pfpr,
-                                    'Cases U5': clinical_cases,
-                                    'Severe cases U5': severe_cases,
-                                    'Pop U5': pop,
-                                    'PfPR_2to10': PfPR_2to10,
-                                    'annualeir': annualeir})
-            simdata['year'] = year
-            adf = pd.concat([adf, simdata])
-
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                try:
-                    adf[sweep_var] = simulation.tags[sweep_var]
-                except:
-                    adf[sweep_var] = '-'.join([str(x) for x in simulation.tags[sweep_var]])
-            elif sweep_var == 'Run_Number' :
-                adf[sweep_var] = 0
+        simdata = {}
+        nyears = self.end_year - self.start_year
+        for i, ipf in enumerate(self.ipfilters):
+            reports = [data[fname] for fname in self.filenames[i * nyears:(i + 1) * nyears]]
+            adf = summary_report_frame(reports, self.channels, n_time=self.n_time,
+                                       time_col=self.time_col, time_values=range(1, self.n_time + 1),
+                                       report_col='year', report_values=range(self.start_year, self.end_year),
+                                       time_channels=self.time_channels, bins=self.bins, agebin_col=self.agebin_col)
 
-        return adf
+            add_sweep_tags(adf, simulation, self.sweep_variables)
+            simdata[ipf] = adf
+
+        return simdata
 
     def finalize(self, all_data):
 
@@ -300,169 +180,96 @@ class MonthlyPfPRAnalyzerU5(BaseAnalyzer):
         if len(selected) == 0:
             print("\nWarning: No data have been returned... Exiting...")
             return
+        store_simulations(self, all_data.keys())
 
         if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
             os.mkdir(os.path.join(self.working_dir, self.expt_name))
 
         print(f'\nSaving outputs to: {os.path.join(self.working_dir, self.expt_name)}')
 
-        adf = pd.concat(selected).reset_index(drop=True)
-        if self.burnin is not None:
-            adf = adf[adf['year'] > self.start_year + self.burnin]
-        adf.to_csv((os.path.join(self.working_dir, self.expt_name, 'U5_PfPR_ClinicalIncidence.csv')), index=False)
+        for ipf in self.ipfilters:
+            adf = concat_tagged([data[ipf] for data in selected]).reset_index(drop=True)
+            if self.burnin is not None:
+                adf = adf[adf['year'] > self.start_year + self.burnin]
+            if self.agebin_max is not None:
+                adf = adf.loc[adf[self.agebin_col] < self.agebin_max]
+            write_table(adf, os.path.join(self.working_dir, self.expt_name, self.output_fname.format(ipfilter=ipf)),
+                        self.output_format, self.sweep_variables, store=self.store)
 
 
-class MonthlyPfPRAnalyzerU10(BaseAnalyzer):
+# MonthlyAgebinPfPRAnalyzer
+class MonthlyAgebinPfPRAnalyzer(SummaryReportAnalyzer):
 
-    def __init__(self, expt_name, sweep_variables=None, working_dir='./', start_year=2020, end_year=2023,
-                 burnin=None, filter_exists=False):
+    def __init__(self, expt_name, sweep_variables=None, working_dir='./', start_year=2020,
+                 end_year=2023, ipfilters=None,
+                 burnin=None, filter_exists=False, output_format='csv', store=False):
 
-        super(MonthlyPfPRAnalyzerU10, self).__init__(working_dir=working_dir,
-                                                     filenames=[
-                                                         f"output/MalariaSummaryReport_Monthly_U10_{x}.json"
-                                                         for x in range(start_year, end_year)]
-                                                     )
-        self.sweep_variables = sweep_variables or ["Run_Number"]
-        self.expt_name = expt_name
-        self.start_year = start_year
-        self.end_year = end_year
-        self.burnin = burnin
-        self.filter_exists = filter_exists
+        super(MonthlyAgebinPfPRAnalyzer, self).__init__(expt_name, report_name='Monthly_Agebin',
+                                                        output_fname='Agebin{ipfilter}_PfPR_ClinicalIncidence.csv',
+                                                        agebin_max=100,  # less than 100 years
+                                                        ipfilters=ipfilters, sweep_variables=sweep_variables,
+                                                        working_dir=working_dir, start_year=start_year,
+                                                        end_year=end_year, burnin=burnin,
+                                                        filter_exists=filter_exists, output_format=output_format,
+                                                        store=store)
 
-    def filter(self, simulation):
-        if self.filter_exists:
-            file = os.path.join(simulation.get_path(), self.filenames[0])
-            return os.path.exists(file)
-        else:
-            return True
 
-    def select_simulation_data(self, data, simulation):
+### PER AGE GROUP
+U5_CHANNELS = {'PfPR U5': 'PfPR by Age Bin',
+               'Cases U5': 'Annual Clinical Incidence by Age Bin',
+               'Severe cases U5': 'Annual Severe Incidence by Age Bin',
+               'Pop U5': 'Average Population by Age Bin'}
 
-        adf = pd.DataFrame()
-        for year, fname in zip(range(self.start_year, self.end_year), self.filenames):
-            d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin'][:12]
-            pfpr = [x[1] for x in d]
-            d = data[fname]['DataByTimeAndAgeBins']['Annual Clinical Incidence by Age Bin'][:12]
-            clinical_cases = [x[1] for x in d]
-            d = data[fname]['DataByTimeAndAgeBins']['Annual Severe Incidence by Age Bin'][:12]
-            severe_cases = [x[1] for x in d]
-            d = data[fname]['DataByTimeAndAgeBins']['Average Population by Age Bin'][:12]
-            pop = [x[1] for x in d]
-            simdata = pd.DataFrame({'month': range(1, 13),
-                                    'PfPR U10': pfpr,
-                                    'Cases U10': clinical_cases,
-                                    'Severe cases U10': severe_cases,
-                                    'Pop U10': pop})
-            simdata['year'] = year
-            adf = pd.concat([adf, simdata])
-
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                try:
-                    adf[sweep_var] = simulation.tags[sweep_var]
-                except:
-                    adf[sweep_var] = '-'.join([str(x) for x in simulation.tags[sweep_var]])
-            elif sweep_var == 'Run_Number' :
-                adf[sweep_var] = 0
 
-        return adf
+# MonthlyPfPRAnalyzerU5
+class MonthlyPfPRAnalyzerU5(SummaryReportAnalyzer):
 
-    def finalize(self, all_data):
+    def __init__(self, expt_name, sweep_variables=None, working_dir='./', start_year=2020, end_year=2023,
+                 burnin=None, filter_exists=False, ipfilters=None, output_format='csv', store=False):
 
-        selected = [data for sim, data in all_data.items()]
-        if len(selected) == 0:
-            print("\nWarning: No data have been returned... Exiting...")
-            return
+        super(MonthlyPfPRAnalyzerU5, self).__init__(expt_name, report_name='Monthly_U5',
+                                                    output_fname='U5{ipfilter}_PfPR_ClinicalIncidence.csv',
+                                                    channels=U5_CHANNELS,
+                                                    time_channels={'PfPR_2to10': 'PfPR_2to10',
+                                                                   'annualeir': 'Annual EIR'},
+                                                    bins=[1], agebin_col=None,
+                                                    ipfilters=ipfilters, sweep_variables=sweep_variables,
+                                                    working_dir=working_dir, start_year=start_year,
+                                                    end_year=end_year, burnin=burnin, filter_exists=filter_exists,
+                                                    output_format=output_format, store=store)
 
-        if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
-            os.mkdir(os.path.join(self.working_dir, self.expt_name))
 
-        print(f'\nSaving outputs to: {os.path.join(self.working_dir, self.expt_name)}')
+class MonthlyPfPRAnalyzerU10(SummaryReportAnalyzer):
 
-        adf = pd.concat(selected).reset_index(drop=True)
-        if self.burnin is not None:
-            adf = adf[adf['year'] > self.start_year + self.burnin]
-        adf.to_csv((os.path.join(self.working_dir, self.expt_name, 'U10_PfPR_ClinicalIncidence.csv')), index=False)
+    def __init__(self, expt_name, sweep_variables=None, working_dir='./', start_year=2020, end_year=2023,
+                 burnin=None, filter_exists=False, ipfilters=None, output_format='csv', store=False):
+
+        super(MonthlyPfPRAnalyzerU10, self).__init__(expt_name, report_name='Monthly_U10',
+                                                     output_fname='U10{ipfilter}_PfPR_ClinicalIncidence.csv',
+                                                     channels={k.replace('U5', 'U10'): v
+                                                               for k, v in U5_CHANNELS.items()},
+                                                     bins=[1], agebin_col=None,
+                                                     ipfilters=ipfilters, sweep_variables=sweep_variables,
+                                                     working_dir=working_dir, start_year=start_year,
+                                                     end_year=end_year, burnin=burnin, filter_exists=filter_exists,
+                                                     output_format=output_format, store=store)
 
 
 ### FOR EXERCISE, WEEKLY REPORTING
 # WeeklyPfPRAnalyzerU5
-class WeeklyPfPRAnalyzerU5(BaseAnalyzer):
+class WeeklyPfPRAnalyzerU5(SummaryReportAnalyzer):
 
     def __init__(self, expt_name, sweep_variables=None, working_dir='./', start_year=2020, end_year=2023,
-                 burnin=None, filter_exists=False):
-
-        super(WeeklyPfPRAnalyzerU5, self).__init__(working_dir=working_dir,
-                                                   filenames=[
-                                                       f"output/MalariaSummaryReport_Weekly_U5_{x}.json"
-                                                       for x in range(start_year, end_year)]
-                                                   )
-        self.sweep_variables = sweep_variables or ["Run_Number"]
-        self.expt_name = expt_name
-        self.start_year = start_year
-        self.end_year = end_year
-        self.burnin = burnin
-        self.filter_exists = filter_exists
-
-    def filter(self, simulation):
-        if self.filter_exists:
-            file = os.path.join(simulation.get_path(), self.filenames[0])
-            return os.path.exists(file)
-        else:
-            return True
+                 burnin=None, filter_exists=False, ipfilters=None, output_format='csv', store=False):
 
-    def select_simulation_data(self, data, simulation):
-
-        adf = pd.DataFrame()
-        for year, fname in zip(range(self.start_year, self.end_year), self.filenames):
-            d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin'][:52]
-            pfpr = [x[1] for x in d]
-            d = data[fname]['DataByTimeAndAgeBins']['Annual Clinical Incidence by Age Bin'][:52]
-            clinical_cases = [x[1] for x in d]
-            d = data[fname]['DataByTimeAndAgeBins']['Annual Severe Incidence by Age Bin'][:52]
-            severe_cases = [x[1] for x in d]
-            d = data[fname]['DataByTimeAndAgeBins']['Average Population by Age Bin'][:52]
-            pop = [x[1] for x in d]
-            d = data[fname]['DataByTime']['PfPR_2to10'][:52]
-            PfPR_2to10 = d
-            d = data[fname]['DataByTime']['Annual EIR'][:52]
-            annualeir = d
-            simdata = pd.DataFrame({'week': range(1, 53),
-                                    'PfPR U5': pfpr,
-                                    'Cases U5': clinical_cases,
-                                    'Severe cases U5': severe_cases,
-                                    'Pop U5': pop})
-            simdata['year'] = year
-            adf = pd.concat([adf, simdata])
-
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                try:
-                    adf[sweep_var] = simulation.tags[sweep_var]
-                except:
-                    adf[sweep_var] = '-'.join([str(x) for x in simulation.tags[sweep_var]])
-            elif sweep_var == 'Run_Number' :
-                adf[sweep_var] = 0
-
-        return adf
-
-    def finalize(self, all_data):
-
-        selected = [data for sim, data in all_data.items()]
-        if len(selected) == 0:
-            print("\nWarning: No data have been returned... Exiting...")
-            return
-
-        if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
-            os.mkdir(os.path.join(self.working_dir, self.expt_name))
-
-        print(f'\nSaving outputs to: {os.path.join(self.working_dir, self.expt_name)}')
-
-        adf = pd.concat(selected).reset_index(drop=True)
-        if self.burnin is not None:
-            adf = adf[adf['year'] > self.start_year + self.burnin]
-        adf.to_csv((os.path.join(self.working_dir, self.expt_name, 'U5_PfPR_ClinicalIncidence_weekly.csv')),
-                   index=False)
+        super(WeeklyPfPRAnalyzerU5, self).__init__(expt_name, report_name='Weekly_U5',
+                                                   output_fname='U5{ipfilter}_PfPR_ClinicalIncidence_weekly.csv',
+                                                   channels=U5_CHANNELS, bins=[1], agebin_col=None,
+                                                   interval='weekly',
+                                                   ipfilters=ipfilters, sweep_variables=sweep_variables,
+                                                   working_dir=working_dir, start_year=start_year,
+                                                   end_year=end_year, burnin=burnin, filter_exists=filter_exists,
+                                                   output_format=output_format, store=store)
 
 
 """
@@ -471,86 +278,156 @@ ReportEventRecorder ANALYZER
 
 
 class IndividualEventsAnalyzer(BaseAnalyzer):
-
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
+    """Events from ReportEventRecorder.csv, optionally restricted to selected_year and event_list.
+    With aggregate (list of columns, e.g. ['Year', 'Month', 'Event_Name']) event counts are returned instead of
+    individual events. With streaming=True the recorder is read directly from the simulation folder (LOCAL or
+    NUCLUSTER) in chunks of chunksize rows, restricted to columns, and raw events are appended to the csv output
+    simulation by simulation, so memory does not grow with the size of the experiment."""
 
     def __init__(self, expt_name, sweep_variables=None, working_dir='./', start_year=2022,
-                 selected_year=None, filter_exists=False):
+                 selected_year=None, filter_exists=False, output_format='csv', event_list=None, aggregate=None,
+                 streaming=False, columns=None, chunksize=500000, store=False):
+        self.recorder_file = "output/ReportEventRecorder.csv"
         super(IndividualEventsAnalyzer, self).__init__(working_dir=working_dir,
-                                                       filenames=["output/ReportEventRecorder.csv"]
+                                                       filenames=[] if streaming else [self.recorder_file]
                                                        )
         self.sweep_variables = sweep_variables or ["Run_Number"]
         self.expt_name = expt_name
+        self.output_format = output_format
+        self.store = store
         self.start_year = start_year
         self.selected_year = selected_year
         self.filter_exists = filter_exists  # flag used for NUCLUSTER
+        self.event_list = event_list
+        self.aggregate = aggregate
+        self.streaming = streaming
+        self.columns = columns
+        self.chunksize = chunksize
+        if streaming and not aggregate and output_format != 'csv':
+            raise ValueError('Streaming of individual events only supports csv outputs, use aggregate instead')
 
     def filter(self, simulation):
         if self.filter_exists:
-            file = os.path.join(simulation.get_path(), self.filenames[0])
+            file = os.path.join(simulation.get_path(), self.recorder_file)
             return os.path.exists(file)
         else:
             return True
 
-    def select_simulation_data(self, data, simulation):
+    @property
+    def output_fname(self):
+        if self.selected_year is not None:
+            selected_year_suffix = f'_{self.selected_year}'
+        else:
+            selected_year_suffix = '_all_years'
+        prefix = 'IndividualEventCounts' if self.aggregate else 'IndividualEvents'
+        return os.path.join(self.working_dir, self.expt_name, f'{prefix}{selected_year_suffix}.csv')
 
-        simdata = pd.DataFrame(data[self.filenames[0]])
-        simdata['Day'] = simdata['Time'] % 365
-        simdata['Month'] = simdata['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
-        simdata['Year'] = simdata['Time'].apply(lambda x: int(x / 365) + self.start_year)
+    def select_events(self, simdata, simulation):
+        if self.event_list is not None:
+            simdata = simdata.loc[simdata['Event_Name'].isin(self.event_list)]
+        add_calendar_columns(simdata, self.start_year)
         if self.selected_year is not None:
             simdata = simdata.loc[(simdata['Year'] == self.selected_year)]
 
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                try:
-                    simdata[sweep_var] = simulation.tags[sweep_var]
-                except:
-                    simdata[sweep_var] = '-'.join([str(x) for x in simulation.tags[sweep_var]])
-            elif sweep_var == 'Run_Number':
-                simdata[sweep_var] = 0
+        add_sweep_tags(simdata, simulation, self.sweep_variables)
+
+        if self.aggregate:
+            simdata = simdata.groupby(self.aggregate + self.sweep_variables,
+                                      observed=True)['Time'].agg(len).reset_index()
+            simdata = simdata.rename(columns={'Time': 'count'})
         return simdata
 
+    def stream_events(self, simulation):
+        columns = self.columns
+        if columns is not None:
+            columns = list(dict.fromkeys(['Time', 'Event_Name'] + columns))
+        if self.selected_year is not None:
+            # events are recorded in time order: chunks before the selected year are still read and parsed but
+            # dropped, reading stops at the first chunk after it
+            time_min = (self.selected_year - self.start_year) * 365
+            time_max = time_min + 365
+
+        part_dir = os.path.join(self.working_dir, self.expt_name, 'IndividualEvents_parts')
+        os.makedirs(part_dir, exist_ok=True)
+        part_fname = os.path.join(part_dir, f'{simulation.id}.csv')
+        counts = []
+        header = True
+        for chunk in pd.read_csv(os.path.join(simulation.get_path(), self.recorder_file), usecols=columns,
+                                 chunksize=self.chunksize):
+            if self.selected_year is not None:
+                if chunk['Time'].iloc[0] >= time_max:
+                    break
+                chunk = chunk.loc[(chunk['Time'] >= time_min) & (chunk['Time'] < time_max)]
+            chunk = self.select_events(chunk.copy(), simulation)
+            if chunk.empty:
+                continue
+            if self.aggregate:
+                counts.append(chunk)
+            else:
+                chunk.to_csv(part_fname, mode='w' if header else 'a', header=header, index=False)
+                header = False
+
+        if self.aggregate:
+            if len(counts) == 0:
+                return pd.DataFrame()
+            adf = concat_tagged(counts)
+            return adf.groupby(self.aggregate + self.sweep_variables, observed=True)['count'].sum().reset_index()
+        return part_fname if not header else None
+
+    def select_simulation_data(self, data, simulation):
+
+        if self.streaming:
+            return self.stream_events(simulation)
+        return self.select_events(pd.DataFrame(data[self.recorder_file]), simulation)
+
     def finalize(self, all_data):
 
         selected = [data for sim, data in all_data.items()]
         if len(selected) == 0:
             print("\nWarning: No data have been returned... Exiting...")
             return
-
-        if self.selected_year is not None:
-            selected_year_suffix = f'_{self.selected_year}'
-        else:
-            selected_year_suffix = '_all_years'
+        store_simulations(self, all_data.keys())
 
         if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
             os.mkdir(os.path.join(self.working_dir, self.expt_name))
 
         print(f'\nSaving outputs to: {os.path.join(self.working_dir, self.expt_name)}')
 
-        adf = pd.concat(selected).reset_index(drop=True)
-        adf.to_csv(os.path.join(self.working_dir, self.expt_name, f'IndividualEvents{selected_year_suffix}.csv'),
-                   index=False)
+        if self.streaming and not self.aggregate:
+            # concatenate the csv files written per simulation without loading them
+            with open(self.output_fname, 'w') as fout:
+                header = True
+                for part_fname in [x for x in selected if x is not None]:
+                    with open(part_fname) as fin:
+                        first_line = fin.readline()
+                        if header:
+                            fout.write(first_line)
+                            header = False
+                        shutil.copyfileobj(fin, fout)
+                    os.remove(part_fname)
+            part_dir = os.path.join(self.working_dir, self.expt_name, 'IndividualEvents_parts')
+            if os.path.isdir(part_dir) and not os.listdir(part_dir):
+                os.rmdir(part_dir)
+            return
+
+        adf = concat_tagged(selected).reset_index(drop=True)
+        write_table(adf, self.output_fname, self.output_format, self.sweep_variables, store=self.store)
 
 
 class TransmissionReport(BaseAnalyzer):
+    """Daily, monthly and annual transmission reports (ReportMalariaFiltered), averaged over Run_Number.
+    Monthly and annual values are the sums of sum_channels and means of mean_channels over days.
+    reduce() folds each simulation into running aggregates; memory only stays bounded by the number of output groups
+    with parallel_analyze.run_analyzers, under AnalyzeManager finalize still receives the results of all simulations."""
 
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
+    sum_channels = ['Daily Bites per Human', 'Daily EIR', 'Rainfall']
+    mean_channels = ['Mean Parasitemia', 'PfHRP2 Prevalence']
 
     def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir='./', start_year=2022,
-                 selected_year=None, daily_report=False, monthly_report=False, filter_exists=False):
+                 selected_year=None, daily_report=False, monthly_report=False, filter_exists=False,
+                 output_format='csv', store=False):
         super(TransmissionReport, self).__init__(working_dir=working_dir,
-                                                 filenames=["output/ReportMalariaFiltered.json"])
+                                                 filenames=["output/ReportMalariaFiltered.json"], parse=False)
         self.sweep_variables = sweep_variables or ["Run_Number"]
         self.channels = channels or ['Daily Bites per Human', 'Daily EIR', 'Mean Parasitemia', 'PfHRP2 Prevalence',
                                      'Rainfall']
@@ -559,6 +436,8 @@ class TransmissionReport(BaseAnalyzer):
         self.daily_report = daily_report
         self.monthly_report = monthly_report
         self.expt_name = expt_name
+        self.output_format = output_format
+        self.store = store
         self.filter_exists = filter_exists
 
     def filter(self, simulation):
@@ -568,37 +447,71 @@ class TransmissionReport(BaseAnalyzer):
         else:
             return True
 
+    def period_summary(self, simdata, period):
+        """Monthly or annual sums of sum_channels and means of mean_channels of one simulation"""
+        time = simdata['Time'].values.astype(int)
+        index = time // DAYS_PER_YEAR
+        if period == 'month':
+            index = index * 12 + month_of_day(day_of_year(time)) - 1
+        periods, inverse = np.unique(index, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(periods))
+
+        if period == 'month':
+            years = periods // 12 + self.start_year
+            months = periods % 12 + 1
+            summary = {'date': month_start_date(years, months), 'Year': years, 'Month': months}
+        else:
+            summary = {'Year': periods + self.start_year}
+        for channel in [x for x in self.mean_channels if x in self.channels]:
+            summary[channel] = np.bincount(inverse, weights=simdata[channel].values, minlength=len(periods)) / counts
+        for channel in [x for x in self.sum_channels if x in self.channels]:
+            summary[channel] = np.bincount(inverse, weights=simdata[channel].values, minlength=len(periods))
+        return pd.DataFrame(summary)
+
     def select_simulation_data(self, data, simulation):
-        simdata = pd.DataFrame({x: data[self.filenames[0]]['Channels'][x]['Data'] for x in self.channels})
-        # simdata = simdata[-365:]
+        simdata = output_cache.channel_frame(data, simulation, self.filenames[0], self.channels)
         simdata['Time'] = simdata.index
-        simdata['Day'] = simdata['Time'] % 365
-        simdata['Month'] = simdata['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
-        simdata['Year'] = simdata['Time'].apply(lambda x: int(x / 365) + self.start_year)
-        simdata['date'] = simdata.apply(lambda x: datetime.date(int(x['Year']), int(x['Month']), 1), axis=1)
+        add_calendar_columns(simdata, self.start_year, date='month')
         if self.selected_year is not None:
             simdata = simdata.loc[(simdata['Year'] == self.selected_year)]
 
-        simdata = simdata.groupby(['Time', 'date', 'Day', 'Month', 'Year'])[self.channels].agg(np.mean).reset_index()
+        # only the tables of the requested reports are returned, summed/averaged over days per simulation
+        tables = {'annual': self.period_summary(simdata, 'year')}
+        if self.monthly_report:
+            tables['monthly'] = self.period_summary(simdata, 'month')
+        if self.daily_report:
+            tables['daily'] = simdata[['Time', 'date', 'Day', 'Month', 'Year'] + self.channels].reset_index(drop=True)
+        for table in tables.values():
+            add_sweep_tags(table, simulation, self.sweep_variables)
+        return tables
 
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                try:
-                    simdata[sweep_var] = simulation.tags[sweep_var]
-                except:
-                    simdata[sweep_var] = '-'.join([str(x) for x in simulation.tags[sweep_var]])
-            elif sweep_var == 'Run_Number':
-                simdata[sweep_var] = 0
-        return simdata
+    def reduce(self, aggregates, simdata):
+        """Fold the tables of one simulation into running means over Run_Number"""
+        grp_channels = [x for x in self.sweep_variables if x != "Run_Number"]
+        keys = {'daily': ['Time', 'date', 'Day', 'Month', 'Year'],
+                'monthly': ['date', 'Year', 'Month'],
+                'annual': ['Year']}
+        if aggregates is None:
+            aggregates = {}
+        for report, table in simdata.items():
+            if report not in aggregates:
+                columns = [x for x in table.columns if x not in keys[report] + self.sweep_variables]
+                aggregates[report] = RunningAggregate(keys[report] + grp_channels, columns)
+            aggregates[report].add(table)
+        return aggregates
 
     def finalize(self, all_data):
 
-        selected = [data for sim, data in all_data.items()]
-        if len(selected) == 0:
+        aggregates = None
+        for sim, data in all_data.items():
+            aggregates = self.reduce(aggregates, data)
+        if aggregates is None:
             print("\nWarning: No data have been returned... Exiting...")
             return
+        store_simulations(self, all_data.keys())
+        self.finalize_aggregate(aggregates)
 
-        adf = pd.concat(selected).reset_index(drop=True)
+    def finalize_aggregate(self, aggregates):
 
         if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
             os.mkdir(os.path.join(self.working_dir, self.expt_name))
@@ -610,48 +523,37 @@ class TransmissionReport(BaseAnalyzer):
             selected_year_suffix = '_all_years'
 
         ## Aggregate Run_Number
-        grp_channels = [x for x in self.sweep_variables if x != "Run_Number"]
-        adf = adf.groupby(['Time', 'date', 'Day', 'Month', 'Year'] + grp_channels)[self.channels].agg(
-            np.mean).reset_index()
-
-        sum_channels = ['Daily Bites per Human', 'Daily EIR', 'Rainfall']
-        mean_channels = ['Mean Parasitemia', 'PfHRP2 Prevalence']
         ### DAILY TRANSMISSION
         if self.daily_report:
-            adf.to_csv(
+            write_table(
+                aggregates['daily'].mean(),
                 os.path.join(self.working_dir, self.expt_name, f'daily_transmission_report{selected_year_suffix}.csv'),
-                index=False)
+                self.output_format, self.sweep_variables, store=self.store)
 
         ### MONTHLY TRANSMISSION
         if self.monthly_report:
-            df = adf.groupby(['date', 'Year', 'Month'] + grp_channels)[sum_channels].agg(np.sum).reset_index()
-            pdf = adf.groupby(['date', 'Year', 'Month'] + grp_channels)[mean_channels].agg(np.mean).reset_index()
-            mdf = pd.merge(left=pdf, right=df, on=['date', 'Year', 'Month'] + grp_channels)
+            mdf = aggregates['monthly'].mean()
             mdf = mdf.rename(columns={'Daily Bites per Human': 'Monthly Bites per Human', 'Daily EIR': 'Monthly EIR'})
-            mdf.to_csv(os.path.join(self.working_dir, self.expt_name,
-                                    f'monthly_transmission_report{selected_year_suffix}.csv'), index=False)
+            write_table(mdf, os.path.join(self.working_dir, self.expt_name,
+                                          f'monthly_transmission_report{selected_year_suffix}.csv'),
+                        self.output_format, self.sweep_variables, store=self.store)
 
         ### ANNUAL TRANSMISSION
-        df = adf.groupby(['Year'] + grp_channels)[sum_channels].agg(np.sum).reset_index()
-        pdf = adf.groupby(['Year'] + grp_channels)[mean_channels].agg(np.mean).reset_index()
-        adf = pd.merge(left=pdf, right=df, on=['Year'] + grp_channels)
+        adf = aggregates['annual'].mean()
         adf = adf.rename(columns={'Daily Bites per Human': 'Annual Bites per Human', 'Daily EIR': 'Annual EIR'})
-        adf.to_csv(
+        write_table(
+            adf,
             os.path.join(self.working_dir, self.expt_name, f'annual_transmission_report{selected_year_suffix}.csv'),
-            index=False)
+            self.output_format, self.sweep_variables, store=self.store)
 
 
 class BednetUsageAnalyzer(BaseAnalyzer):
-
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
+    """Monthly bednet usage and new nets per sweep (ReportEventCounter and ReportMalariaFiltered).
+    reduce() folds each simulation into running monthly sums and means; memory only stays bounded by the number of
+    output groups with parallel_analyze.run_analyzers, under AnalyzeManager finalize still receives all results."""
 
     def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir='./', start_year=2022,
-                 selected_year=None, filter_exists=False):
+                 selected_year=None, filter_exists=False, output_format='csv', store=False):
         super(BednetUsageAnalyzer, self).__init__(working_dir=working_dir,
                                                   filenames=["output/ReportEventCounter.json",
                                                              "output/ReportMalariaFiltered.json"])
@@ -661,6 +563,8 @@ class BednetUsageAnalyzer(BaseAnalyzer):
         self.start_year = start_year
         self.selected_year = selected_year
         self.expt_name = expt_name
+        self.output_format = output_format
+        self.store = store
         self.filter_exists = filter_exists
 
     def filter(self, simulation):
@@ -672,70 +576,68 @@ class BednetUsageAnalyzer(BaseAnalyzer):
 
     def select_simulation_data(self, data, simulation):
 
-        simdata = pd.DataFrame({x: data[self.filenames[1]]['Channels'][x]['Data'] for x in self.inset_channels})
+        simdata = output_cache.channel_frame(data, simulation, self.filenames[1], self.inset_channels)
         simdata['Time'] = simdata.index
 
         if self.channels:
-            d = pd.DataFrame({x: data[self.filenames[0]]['Channels'][x]['Data'] for x in self.channels})
-            # d = pd.DataFrame({x: data[self.filenames[0]]['Channels'][x]['Data'][:len(simdata)] for x in self.channels})
+            d = output_cache.channel_frame(data, simulation, self.filenames[0], self.channels)
             d['Time'] = d.index
             simdata = pd.merge(left=simdata, right=d, on='Time')
 
-        simdata['Day'] = simdata['Time'] % 365
-        simdata['Month'] = simdata['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
-        simdata['Year'] = simdata['Time'].apply(lambda x: int(x / 365) + self.start_year)
+        add_calendar_columns(simdata, self.start_year)
 
         if self.selected_year is not None:
             simdata = simdata.loc[(simdata['Year'] == self.selected_year)]
 
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                try:
-                    simdata[sweep_var] = simulation.tags[sweep_var]
-                except:
-                    simdata[sweep_var] = '-'.join([str(x) for x in simulation.tags[sweep_var]])
-            elif sweep_var == 'Run_Number':
-                simdata[sweep_var] = 0
+        add_sweep_tags(simdata, simulation, self.sweep_variables)
         return simdata
 
+    def reduce(self, aggregates, simdata):
+        """Fold the result of one simulation into running monthly sums and means"""
+        if aggregates is None:
+            aggregates = {'sum': RunningAggregate(['date'] + self.sweep_variables, ['Bednet_Got_New_One']),
+                          'mean': RunningAggregate(['date'] + self.sweep_variables,
+                                                   ['Statistical Population', 'Bednet_Using'])}
+        simdata = simdata.copy()
+        simdata['date'] = month_start_date(simdata['Year'], simdata['Month'])
+        for x in [y for y in ['Bednet_Got_New_One', 'Bednet_Using'] if y not in simdata.columns.values]:
+            simdata[x] = 0
+        aggregates['sum'].add(simdata)
+        aggregates['mean'].add(simdata)
+        return aggregates
+
     def finalize(self, all_data):
 
-        selected = [data for sim, data in all_data.items()]
-        if len(selected) == 0:
+        aggregates = None
+        for sim, data in all_data.items():
+            aggregates = self.reduce(aggregates, data)
+        if aggregates is None:
             print("\nWarning: No data have been returned... Exiting...")
             return
+        store_simulations(self, all_data.keys())
+        self.finalize_aggregate(aggregates)
 
-        adf = pd.concat(selected).reset_index(drop=True)
-        adf['date'] = adf.apply(lambda x: datetime.date(int(x['Year']), int(x['Month']), 1), axis=1)
+    def finalize_aggregate(self, aggregates):
 
         if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
             os.mkdir(os.path.join(self.working_dir, self.expt_name))
         print(f'\nSaving outputs to: {os.path.join(self.working_dir, self.expt_name)}')
 
         ## Aggregate time to months
-        sum_channels = ['Bednet_Got_New_One']
-        for x in [y for y in sum_channels if y not in adf.columns.values]:
-            adf[x] = 0
-        mean_channels = ['Statistical Population', 'Bednet_Using']
-        df = adf.groupby(['date'] + self.sweep_variables)[sum_channels].agg(np.sum).reset_index()
-        pdf = adf.groupby(['date'] + self.sweep_variables)[mean_channels].agg(np.mean).reset_index()
+        df = aggregates['sum'].sum()
+        pdf = aggregates['mean'].mean()
 
         adf = pd.merge(left=pdf, right=df, on=['date'] + self.sweep_variables)
         adf['mean_usage'] = adf['Bednet_Using'] / adf['Statistical Population']
         adf['new_net_coverage'] = adf['Bednet_Got_New_One'] / adf['Statistical Population']
-        adf.to_csv(os.path.join(self.working_dir, self.expt_name, f'BednetUsageAnalyzer.csv'), index=False)
+        write_table(adf, os.path.join(self.working_dir, self.expt_name, f'BednetUsageAnalyzer.csv'),
+                    self.output_format, self.sweep_variables, store=self.store)
 
 
 class ReceivedCampaignAnalyzer(BaseAnalyzer):
 
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
-
-    def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir='./', start_year=2022):
+    def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir='./', start_year=2022,
+                 output_format='csv', store=False):
         super(ReceivedCampaignAnalyzer, self).__init__(working_dir=working_dir,
                                                        filenames=["output/ReportEventCounter.json",
                                                                   "output/InsetChart.json"])
@@ -743,25 +645,17 @@ class ReceivedCampaignAnalyzer(BaseAnalyzer):
         self.channels = channels or ['Received_Treatment']
         self.start_year = start_year
         self.expt_name = expt_name
+        self.output_format = output_format
+        self.store = store
 
     def select_simulation_data(self, data, simulation):
 
-        simdata = pd.DataFrame({x: data[self.filenames[0]]['Channels'][x]['Data'] for x in self.channels})
-        simdata['Population'] = data[self.filenames[1]]['Channels']['Statistical Population']['Data']
+        simdata = output_cache.channel_frame(data, simulation, self.filenames[0], self.channels)
+        simdata['Population'] = output_cache.channel(data, simulation, self.filenames[1], 'Statistical Population')
         simdata['Time'] = simdata.index
-        simdata['Day'] = simdata['Time'] % 365
-        simdata['Year'] = simdata['Time'].apply(lambda x: int(x / 365) + 2022)
-        simdata['date'] = simdata.apply(
-            lambda x: datetime.date(int(x['Year']), 1, 1) + datetime.timedelta(int(x['Day']) - 1), axis=1)
-
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                try:
-                    simdata[sweep_var] = simulation.tags[sweep_var]
-                except:
-                    simdata[sweep_var] = '-'.join([str(x) for x in simulation.tags[sweep_var]])
-            elif sweep_var == 'Run_Number':
-                simdata[sweep_var] = 0
+        add_calendar_columns(simdata, self.start_year, month_col=None, date='day')
+
+        add_sweep_tags(simdata, simulation, self.sweep_variables)
         return simdata
 
     def finalize(self, all_data):
@@ -770,8 +664,9 @@ class ReceivedCampaignAnalyzer(BaseAnalyzer):
         if len(selected) == 0:
             print("\nWarning: No data have been returned... Exiting...")
             return
+        store_simulations(self, all_data.keys())
 
-        adf = pd.concat(selected).reset_index(drop=True)
+        adf = concat_tagged(selected).reset_index(drop=True)
 
         if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
             os.mkdir(os.path.join(self.working_dir, self.expt_name))
@@ -780,7 +675,8 @@ class ReceivedCampaignAnalyzer(BaseAnalyzer):
         events = [ch.replace('Received_', '') for ch in self.channels if 'Received' in ch]
         for event in events:
             adf[f'{event}_Coverage'] = adf[f'Received_{event}'] / adf['Population']
-        adf.to_csv(os.path.join(self.working_dir, self.expt_name, f'Event_Count.csv'), index=False)
+        write_table(adf, os.path.join(self.working_dir, self.expt_name, f'Event_Count.csv'),
+                    self.output_format, self.sweep_variables, store=self.store)
 
 
 """
@@ -791,15 +687,8 @@ ReportEventCounter Analyzer
 # MonthlyTreatedCasesAnalyzer
 class MonthlyTreatedCasesAnalyzer(BaseAnalyzer):
 
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
-
     def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir=".", start_year=2010,
-                 end_year=2020, filter_exists=False):
+                 end_year=2020, filter_exists=False, output_format='csv', store=False):
         super(MonthlyTreatedCasesAnalyzer, self).__init__(working_dir=working_dir,
                                                           filenames=["output/ReportEventCounter.json",
                                                                      "output/ReportMalariaFiltered.json"]
@@ -809,6 +698,8 @@ class MonthlyTreatedCasesAnalyzer(BaseAnalyzer):
         self.inset_channels = ['Statistical Population', 'New Infections', 'Newly Symptomatic', 'New Clinical Cases',
                                'New Severe Cases', 'PfHRP2 Prevalence']
         self.expt_name = expt_name
+        self.output_format = output_format
+        self.store = store
         self.start_year = start_year
         self.end_year = end_year
         self.filter_exists = filter_exists
@@ -821,17 +712,15 @@ class MonthlyTreatedCasesAnalyzer(BaseAnalyzer):
             return True
 
     def select_simulation_data(self, data, simulation):
-        simdata = pd.DataFrame({x: data[self.filenames[1]]['Channels'][x]['Data'] for x in self.inset_channels})
+        simdata = output_cache.channel_frame(data, simulation, self.filenames[1], self.inset_channels)
         simdata['Time'] = simdata.index
         if self.channels:
-            d = pd.DataFrame({x: data[self.filenames[0]]['Channels'][x]['Data'] for x in self.channels})
+            d = output_cache.channel_frame(data, simulation, self.filenames[0], self.channels)
             d['Time'] = d.index
             simdata = pd.merge(left=simdata, right=d, on='Time')
-        simdata['Day'] = simdata['Time'] % 365
-        simdata['Month'] = simdata['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
-        simdata['Year'] = simdata['Time'].apply(lambda x: int(x / 365) + self.start_year)
+        add_calendar_columns(simdata, self.start_year)
         if self.start_year > 0:
-            simdata['date'] = simdata.apply(lambda x: datetime.date(int(x['Year']), int(x['Month']), 1), axis=1)
+            simdata['date'] = month_start_date(simdata['Year'], simdata['Month'])
         else:
             simdata['date'] = simdata["Year"].astype(str) + '-' + simdata["Month"].astype(str) + '-' + simdata[
                 "Day"].astype(str)
@@ -847,14 +736,7 @@ class MonthlyTreatedCasesAnalyzer(BaseAnalyzer):
 
         simdata = pd.merge(left=pdf, right=df, on=['date'])
 
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                try:
-                    simdata[sweep_var] = simulation.tags[sweep_var]
-                except:
-                    simdata[sweep_var] = '-'.join([str(x) for x in simulation.tags[sweep_var]])
-            elif sweep_var == 'Run_Number':
-                simdata[sweep_var] = 0
+        add_sweep_tags(simdata, simulation, self.sweep_variables)
         return simdata
 
     def finalize(self, all_data):
@@ -863,27 +745,40 @@ class MonthlyTreatedCasesAnalyzer(BaseAnalyzer):
         if len(selected) == 0:
             print("No data have been returned... Exiting...")
             return
+        store_simulations(self, all_data.keys())
 
         if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
             os.mkdir(os.path.join(self.working_dir, self.expt_name))
 
         print(f'\nSaving outputs to: {os.path.join(self.working_dir, self.expt_name)}')
 
-        adf = pd.concat(selected).reset_index(drop=True)
-        adf.to_csv(os.path.join(self.working_dir, self.expt_name, 'All_Age_Monthly_Cases.csv'), index=False)
+        adf = concat_tagged(selected).reset_index(drop=True)
+        write_table(adf, os.path.join(self.working_dir, self.expt_name, 'All_Age_Monthly_Cases.csv'),
+                    self.output_format, self.sweep_variables, store=self.store)
 
 
 # MonthlySevereTreatedByAgeAnalyzer
-class MonthlySevereTreatedByAgeAnalyzer(BaseAnalyzer):
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
+def fix_excess_severe_treatment(df, treated_col, cases_col, group_cols, start_year):
+    """Cap the number of severe treatments at the number of severe cases (in place).
+    If the first month of the simulation (January of start_year) treated at least one case more than
+    there were cases, treatments of that month are set to its severe cases in every run/sweep group.
+    Remaining months with more than 0.5 excess treatments are then capped at their number of severe cases."""
+    excess = df[treated_col] - df[cases_col]
+    first_month = (df['year'] == start_year) & (df['month'] == 1)
+    groups = [df['Run_Number'], df.groupby(group_cols, sort=False, observed=True).ngroup()]
+    fix_first = (first_month & (excess >= 1)).groupby(groups).transform('any')
+    first_cases = df[cases_col].where(first_month, 0).groupby(groups).transform('sum')
+    df.loc[first_month & fix_first, treated_col] = first_cases[first_month & fix_first]
+
+    excess = df[treated_col] - df[cases_col]
+    df.loc[excess > 0.5, treated_col] = df.loc[excess > 0.5, cases_col]
+    return df
+
 
+class MonthlySevereTreatedByAgeAnalyzer(BaseAnalyzer):
     def __init__(self, expt_name, event_name='Received_Severe_Treatment', agebins=None,
-                 sweep_variables=None, working_dir=".", start_year=2010, end_year=2020):
+                 sweep_variables=None, working_dir=".", start_year=2010, end_year=2020, output_format='csv',
+                 store=False):
         super(MonthlySevereTreatedByAgeAnalyzer, self).__init__(working_dir=working_dir,
                                                                 filenames=["output/ReportEventRecorder.csv"]
                                                                 )
@@ -891,6 +786,8 @@ class MonthlySevereTreatedByAgeAnalyzer(BaseAnalyzer):
         self.event_name = event_name
         self.agebins = agebins or [1, 5, 200]
         self.expt_name = expt_name
+        self.output_format = output_format
+        self.store = store
         self.start_year = start_year
         self.end_year = end_year
 
@@ -901,9 +798,7 @@ class MonthlySevereTreatedByAgeAnalyzer(BaseAnalyzer):
 
         simdata = pd.DataFrame()
         if len(output_data) > 0:  # there are events of this type
-            output_data['Day'] = output_data['Time'] % 365
-            output_data['month'] = output_data['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
-            output_data['year'] = output_data['Time'].apply(lambda x: int(x / 365) + self.start_year)
+            add_calendar_columns(output_data, self.start_year, month_col='month', year_col='year')
             output_data['age in years'] = output_data['Age'] / 365
 
             for agemax in self.agebins:
@@ -925,11 +820,7 @@ class MonthlySevereTreatedByAgeAnalyzer(BaseAnalyzer):
                         simdata = pd.merge(left=simdata, right=g, on=['year', 'month'], how='outer')
                         simdata = simdata.fillna(0)
 
-            for sweep_var in self.sweep_variables:
-                if sweep_var in simulation.tags.keys():
-                    simdata[sweep_var] = simulation.tags[sweep_var]
-                elif sweep_var == 'Run_Number':
-                    simdata[sweep_var] = 0
+            add_sweep_tags(simdata, simulation, self.sweep_variables)
         else:
             simdata = pd.DataFrame(columns=['year', 'month', 'Num_U5_Received_Severe_Treatment',
                                             'Num_U1_Received_Severe_Treatment',
@@ -942,14 +833,15 @@ class MonthlySevereTreatedByAgeAnalyzer(BaseAnalyzer):
         if len(selected) == 0:
             print("No data have been returned... Exiting...")
             return
+        store_simulations(self, all_data.keys())
 
         if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
             os.mkdir(os.path.join(self.working_dir, self.expt_name))
 
-        adf = pd.concat(selected, sort=False).reset_index(drop=True)
+        adf = concat_tagged(selected, sort=False).reset_index(drop=True)
         adf = adf.fillna(0)
-        adf.to_csv(os.path.join(self.working_dir, self.expt_name, 'Treated_Severe_Monthly_Cases_By_Age.csv'),
-                   index=False)
+        write_table(adf, os.path.join(self.working_dir, self.expt_name, 'Treated_Severe_Monthly_Cases_By_Age.csv'),
+                    self.output_format, self.sweep_variables, store=self.store)
 
         for agelabel in ['U5']:
             severe_treat_df = adf[
@@ -958,7 +850,7 @@ class MonthlySevereTreatedByAgeAnalyzer(BaseAnalyzer):
             severe_treat_df = severe_treat_df.astype({'month': 'int64', 'year': 'int64', 'Run_Number': 'int64'})
 
             # combine with existing columns of the U5 clinical incidence and PfPR dataframe
-            incidence_df = pd.read_csv(
+            incidence_df = read_table(
                 os.path.join(self.working_dir, self.expt_name, '%s_PfPR_ClinicalIncidence.csv' % agelabel))
             merged_df = pd.merge(left=incidence_df, right=severe_treat_df,
                                  on=self.sweep_variables + ['year', 'month'],
@@ -968,67 +860,20 @@ class MonthlySevereTreatedByAgeAnalyzer(BaseAnalyzer):
             # fix any excess treated cases!
             merged_df['num severe cases %s' % agelabel] = merged_df['Severe cases %s' % agelabel] * merged_df[
                 'Pop %s' % agelabel] * 30 / 365
-            merged_df['excess sev treat %s' % agelabel] = merged_df['Num_%s_Received_Severe_Treatment' % agelabel] - \
-                                                          merged_df['num severe cases %s' % agelabel]
-            merged_df['sweep_id'] = merged_df.groupby(self.sweep_variables, sort=False).ngroup().apply(
-                '{:010}'.format)
-
-            for (rn, sweep), rdf in merged_df.groupby(['Run_Number', 'sweep_id']):
-                for r, row in rdf.iterrows():
-                    if row['excess sev treat %s' % agelabel] < 1:
-                        continue
-                    # fix Jan 2020 (start of sim) excess treated severe cases
-                    if row['year'] == self.start_year and row['month'] == 1:
-                        merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                merged_df['Run_Number'] == rn) & (merged_df[self.sweep_id] == sweep),
-                                      'Num_%s_Received_Severe_Treatment' % agelabel] = np.sum(
-                            merged_df[(merged_df['year'] == self.start_year) &
-                                      (merged_df['month'] == 1) &
-                                      (merged_df['Run_Number'] == rn) &
-                                      (merged_df[self.sweep_id] == sweep)]['num severe cases %s' % agelabel])
-                    else:
-                        # figure out which is previous month
-                        newyear = row['year']
-                        newmonth = row['month'] - 1
-                        if newmonth < 1:
-                            newyear -= 1
-                        excess = row['excess sev treat %s' % agelabel]
-                        merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                merged_df['Run_Number'] == rn) & (merged_df[
-                                                                      self.sweep_id] == sweep), 'Num_%s_Received_Severe_Treatment' % agelabel] = \
-                            merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                    merged_df['Run_Number'] == rn) & (merged_df[self.sweep_id] == sweep),
-                                          'Num_%s_Received_Severe_Treatment' % agelabel] - excess
-                        merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                merged_df['Run_Number'] == rn) & (merged_df[
-                                                                      self.sweep_id] == sweep), 'Num_%s_Received_Severe_Treatment' % agelabel] = \
-                            merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                    merged_df['Run_Number'] == rn) & (merged_df[self.sweep_id] == sweep),
-                                          'Num_%s_Received_Severe_Treatment' % agelabel] + excess
-            merged_df['excess sev treat %s' % agelabel] = merged_df['Num_%s_Received_Severe_Treatment' % agelabel] - \
-                                                          merged_df['num severe cases %s' % agelabel]
-            merged_df.loc[
-                merged_df['excess sev treat %s' % agelabel] > 0.5, 'Num_%s_Received_Severe_Treatment' % agelabel] = \
-                merged_df.loc[merged_df['excess sev treat %s' % agelabel] > 0.5, 'num severe cases %s' % agelabel]
+            fix_excess_severe_treatment(merged_df, 'Num_%s_Received_Severe_Treatment' % agelabel,
+                                        'num severe cases %s' % agelabel, self.sweep_variables, self.start_year)
 
             del merged_df['num severe cases %s' % agelabel]
-            del merged_df['excess sev treat %s' % agelabel]
-            merged_df.to_csv(os.path.join(self.working_dir, self.expt_name,
-                                          '%s_PfPR_ClinicalIncidence_severeTreatment.csv' % agelabel), index=False)
+            write_table(merged_df, os.path.join(self.working_dir, self.expt_name,
+                                                '%s_PfPR_ClinicalIncidence_severeTreatment.csv' % agelabel),
+                        self.output_format, self.sweep_variables, store=self.store)
 
 
 # MonthlyAgebinSevereTreatedAnalyzer
 class MonthlyAgebinSevereTreatedAnalyzer(BaseAnalyzer):
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
-
     def __init__(self, expt_name, event_name='Received_Severe_Treatment', agebins=None,
                  sweep_variables=None, IP_variable=None, working_dir=".", start_year=2000, end_year=2020,
-                 filter_exists=False):
+                 filter_exists=False, output_format='csv', store=False):
         super(MonthlyAgebinSevereTreatedAnalyzer, self).__init__(working_dir=working_dir,
                                                                  filenames=["output/ReportEventRecorder.csv"]
                                                                  )
@@ -1037,6 +882,8 @@ class MonthlyAgebinSevereTreatedAnalyzer(BaseAnalyzer):
         self.event_name = event_name
         self.agebins = agebins or [2, 5, 10, 20, 100]
         self.expt_name = expt_name
+        self.output_format = output_format
+        self.store = store
         self.start_year = start_year
         self.end_year = end_year
         self.filter_exists = filter_exists
@@ -1055,9 +902,7 @@ class MonthlyAgebinSevereTreatedAnalyzer(BaseAnalyzer):
 
         simdata = pd.DataFrame()
         if len(output_data) > 0:  # there are events of this type
-            output_data['Day'] = output_data['Time'] % 365
-            output_data['month'] = output_data['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
-            output_data['year'] = output_data['Time'].apply(lambda x: int(x / 365) + self.start_year)
+            add_calendar_columns(output_data, self.start_year, month_col='month', year_col='year')
             output_data['age in years'] = output_data['Age'] / 365
 
             for i, agemax in enumerate(self.agebins):
@@ -1079,14 +924,7 @@ class MonthlyAgebinSevereTreatedAnalyzer(BaseAnalyzer):
                         simdata = pd.concat([g, simdata])
                         simdata = simdata.fillna(0)
 
-            for sweep_var in self.sweep_variables:
-                if sweep_var in simulation.tags.keys():
-                    try:
-                        simdata[sweep_var] = simulation.tags[sweep_var]
-                    except:
-                        simdata[sweep_var] = '-'.join([str(x) for x in simulation.tags[sweep_var]])
-                elif sweep_var == 'Run_Number':
-                    simdata[sweep_var] = 0
+            add_sweep_tags(simdata, simulation, self.sweep_variables)
         else:
             simdata = pd.DataFrame(
                 columns=list(filter(None, ['year', 'month', 'agebin', 'Num_Received_Severe_Treatment'] +
@@ -1099,18 +937,21 @@ class MonthlyAgebinSevereTreatedAnalyzer(BaseAnalyzer):
         if len(selected) == 0:
             print("No data have been returned... Exiting...")
             return
+        store_simulations(self, all_data.keys())
 
         if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
             os.mkdir(os.path.join(self.working_dir, self.expt_name))
 
-        adf = pd.concat(selected, sort=False).reset_index(drop=True)
+        adf = concat_tagged(selected, sort=False).reset_index(drop=True)
         adf = adf.fillna(0)
 
+        # written by MonthlyAgebinPfPRAnalyzer
+        incidence_fname = os.path.join(self.working_dir, self.expt_name, 'Agebin_PfPR_ClinicalIncidence.csv')
         merged_df_all = pd.DataFrame()
         for i, agebin in enumerate(self.agebins):
 
             # Does not support IPfilter, currently also not needed
-            if os.path.exists(os.path.join(self.working_dir, 'Agebin_PfPR_ClinicalIncidence.csv')):
+            if table_exists(incidence_fname):
                 severe_treat_df = adf[
                     ['year', 'month', 'agebin', 'Num_Received_Severe_Treatment'] + self.sweep_variables]
                 severe_treat_df = severe_treat_df[(severe_treat_df['agebin'] == agebin)]
@@ -1118,8 +959,7 @@ class MonthlyAgebinSevereTreatedAnalyzer(BaseAnalyzer):
                 severe_treat_df = severe_treat_df.astype({'month': 'int64', 'year': 'int64', 'Run_Number': 'int64'})
 
                 # combine with existing columns of the clinical incidence and PfPR dataframe
-                incidence_df = pd.read_csv(
-                    os.path.join(self.working_dir, f'{self.agebin_name}_PfPR_ClinicalIncidence.csv'))
+                incidence_df = read_table(incidence_fname)
                 incidence_df = incidence_df[(incidence_df['agebin'] == agebin)]
                 merged_df = pd.merge(left=incidence_df, right=severe_treat_df,
                                      on=self.sweep_variables + ['year', 'month', 'agebin'],
@@ -1128,60 +968,19 @@ class MonthlyAgebinSevereTreatedAnalyzer(BaseAnalyzer):
 
                 # fix any excess treated cases!
                 merged_df['num severe cases'] = merged_df['Severe cases'] * merged_df['Pop'] * 30 / 365
-                merged_df['excess sev treat'] = merged_df['Num_Received_Severe_Treatment'] - merged_df[
-                    'num severe cases']
-                merged_df['sweep_id'] = merged_df.groupby(self.sweep_variables, sort=False).ngroup().apply(
-                    '{:010}'.format)
-
-                for (rn, sweep), rdf in merged_df.groupby(['Run_Number', 'sweep_id']):
-                    for r, row in rdf.iterrows():
-                        if row['excess sev treat'] < 1:
-                            continue
-                        # fix Jan 2020 (start of sim) excess treated severe cases
-                        if row['year'] == self.start_year and row['month'] == 1:
-                            merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                    merged_df['Run_Number'] == rn) & (merged_df['sweep_id'] == sweep),
-                                          'Num_Received_Severe_Treatment'] = np.sum(
-                                merged_df[(merged_df['year'] == self.start_year) &
-                                          (merged_df['month'] == 1) &
-                                          (merged_df['Run_Number'] == rn) &
-                                          (merged_df['sweep_id'] == sweep)]['num severe cases'])
-                        else:
-                            # figure out which is previous month
-                            newyear = row['year']
-                            newmonth = row['month'] - 1
-                            if newmonth < 1:
-                                newyear -= 1
-                            excess = row['excess sev treat']
-                            merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                    merged_df['Run_Number'] == rn) & (merged_df[
-                                                                          'sweep_id'] == sweep), 'Num_Received_Severe_Treatment'] = \
-                                merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                        merged_df['Run_Number'] == rn) & (merged_df['sweep_id'] == sweep),
-                                              'Num_Received_Severe_Treatment'] - excess
-                            merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                    merged_df['Run_Number'] == rn) & (merged_df[
-                                                                          'sweep_id'] == sweep), 'Num_Received_Severe_Treatment'] = \
-                                merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                        merged_df['Run_Number'] == rn) & (merged_df['sweep_id'] == sweep),
-                                              'Num_Received_Severe_Treatment'] + excess
-                merged_df['excess sev treat'] = merged_df['Num_Received_Severe_Treatment'] - \
-                                                merged_df['num severe cases']
-                merged_df.loc[
-                    merged_df['excess sev treat'] > 0.5, 'Num_Received_Severe_Treatment'] = \
-                    merged_df.loc[merged_df['excess sev treat'] > 0.5, 'num severe cases']
+                fix_excess_severe_treatment(merged_df, 'Num_Received_Severe_Treatment', 'num severe cases',
+                                            self.sweep_variables, self.start_year)
 
                 del merged_df['num severe cases']
-                del merged_df['excess sev treat']
                 if merged_df_all.empty:
                     merged_df_all = merged_df
                 else:
                     merged_df_all = pd.concat([merged_df_all, merged_df])
             else:
                 pass
-        merged_df_all.to_csv(os.path.join(self.working_dir, self.expt_name,
-                                          'Agebin_PfPR_ClinicalIncidence_severeTreatment.csv'),
-                             index=False)
+        write_table(merged_df_all, os.path.join(self.working_dir, self.expt_name,
+                                                'Agebin_PfPR_ClinicalIncidence_severeTreatment.csv'),
+                    self.output_format, self.sweep_variables, store=self.store)
 
 
 """
@@ -1189,177 +988,28 @@ With IP filter
 """
 
 
-class MonthlyPfPRAnalyzerU5IP(BaseAnalyzer):
+class MonthlyPfPRAnalyzerU5IP(MonthlyPfPRAnalyzerU5):
 
     def __init__(self, expt_name, sweep_variables=None, working_dir='./', start_year=2020, end_year=2023,
-                 burnin=None, filter_exists=False, ipfilter=''):
+                 burnin=None, filter_exists=False, ipfilter='', output_format='csv', store=False):
 
-        super(MonthlyPfPRAnalyzerU5IP, self).__init__(working_dir=working_dir,
-                                                    filenames=[
-                                                        f"output/MalariaSummaryReport_Monthly_U5{ipfilter}_{x}.json"
-                                                        for x in range(start_year, end_year)]
-                                                    )
-        self.sweep_variables = sweep_variables or ["Run_Number"]
-        self.expt_name = expt_name
-        self.start_year = start_year
-        self.end_year = end_year
-        self.burnin = burnin
-        self.filter_exists = filter_exists
+        super(MonthlyPfPRAnalyzerU5IP, self).__init__(expt_name, sweep_variables=sweep_variables,
+                                                      working_dir=working_dir, start_year=start_year,
+                                                      end_year=end_year, burnin=burnin,
+                                                      filter_exists=filter_exists, ipfilters=[ipfilter],
+                                                      output_format=output_format, store=store)
         self.ipfilter = ipfilter
 
-    def filter(self, simulation):
-        if self.filter_exists:
-            file = os.path.join(simulation.get_path(), self.filenames[0])
-            return os.path.exists(file)
-        else:
-            return True
 
-    def select_simulation_data(self, data, simulation):
-
-        adf = pd.DataFrame()
-        for year, fname in zip(range(self.start_year, self.end_year), self.filenames):
-            d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin'][:12]
-            pfpr = [x[1] for x in d]
-            d = data[fname]['DataByTimeAndAgeBins']['Annual Clinical Incidence by Age Bin'][:12]
-            clinical_cases = [x[1] for x in d]
-            d = data[fname]['DataByTimeAndAgeBins']['Annual Severe Incidence by Age Bin'][:12]
-            severe_cases = [x[1] for x in d]
-            d = data[fname]['DataByTimeAndAgeBins']['Average Population by Age Bin'][:12]
-            pop = [x[1] for x in d]
-            d = data[fname]['DataByTime']['PfPR_2to10'][:12]
-            PfPR_2to10 = d
-            d = data[fname]['DataByTime']['Annual EIR'][:12]
-            annualeir = d
-            simdata = pd.DataFrame({'month': range(1, 13),
-                                    'PfPR U5': pfpr,
-                                    'Cases U5': clinical_cases,
-                                    'Severe cases U5': severe_cases,
-                                    'Pop U5': pop,
-                                    'PfPR_2to10': PfPR_2to10,
-                                    'annualeir': annualeir})
-            simdata['year'] = year
-            adf = pd.concat([adf, simdata])
-
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                try:
-                    adf[sweep_var] = simulation.tags[sweep_var]
-                except:
-                    adf[sweep_var] = '-'.join([str(x) for x in simulation.tags[sweep_var]])
-            elif sweep_var == 'Run_Number':
-                adf[sweep_var] = 0
-
-        return adf
-
-    def finalize(self, all_data):
-
-        selected = [data for sim, data in all_data.items()]
-        if len(selected) == 0:
-            print("\nWarning: No data have been returned... Exiting...")
-            return
-
-        if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
-            os.mkdir(os.path.join(self.working_dir, self.expt_name))
-
-        print(f'\nSaving outputs to: {os.path.join(self.working_dir, self.expt_name)}')
-
-        adf = pd.concat(selected).reset_index(drop=True)
-        if self.burnin is not None:
-            adf = adf[adf['year'] > self.start_year + self.burnin]
-        adf.to_csv((os.path.join(self.working_dir, self.expt_name, f'U5{self.ipfilter}_PfPR_ClinicalIncidence.csv')), index=False)
-
-
-class MonthlyAgebinPfPRAnalyzerIP(BaseAnalyzer):
+class MonthlyAgebinPfPRAnalyzerIP(MonthlyAgebinPfPRAnalyzer):
 
     def __init__(self, expt_name, sweep_variables=None, working_dir='./', start_year=2020,
                  end_year=2023, ipfilter='',
-                 burnin=None, filter_exists=False):
+                 burnin=None, filter_exists=False, output_format='csv', store=False):
 
-        super(MonthlyAgebinPfPRAnalyzerIP, self).__init__(working_dir=working_dir,
-                                                          filenames=[
-                                                              f"output/MalariaSummaryReport_Monthly_Agebin{ipfilter}_{x}.json"
-                                                              for x in range(start_year, end_year)]
-                                                          )
-        self.sweep_variables = sweep_variables or ["Run_Number"]
-        self.expt_name = expt_name
-        self.start_year = start_year
-        self.end_year = end_year
-        self.burnin = burnin
-        self.filter_exists = filter_exists
+        super(MonthlyAgebinPfPRAnalyzerIP, self).__init__(expt_name, sweep_variables=sweep_variables,
+                                                          working_dir=working_dir, start_year=start_year,
+                                                          end_year=end_year, ipfilters=[ipfilter],
+                                                          burnin=burnin, filter_exists=filter_exists,
+                                                          output_format=output_format, store=store)
         self.ipfilter = ipfilter
-
-    def filter(self, simulation):
-        if self.filter_exists:
-            file = os.path.join(simulation.get_path(), self.filenames[0])
-            return os.path.exists(file)
-        else:
-            return True
-
-    def select_simulation_data(self, data, simulation):
-
-        adf = pd.DataFrame()
-        for year, fname in zip(range(self.start_year, self.end_year), self.filenames):
-
-            age_bins = data[fname]['Metadata']['Age Bins']
-
-            for age in list(range(0, len(age_bins))):
-                d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin'][:12]
-                pfpr = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['Annual Clinical Incidence by Age Bin'][:12]
-                clinical_cases = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['Annual Severe Incidence by Age Bin'][:12]
-                severe_cases = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['Annual Mild Anemia by Age Bin'][:12]
-                mild_anaemia = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['Annual Moderate Anemia by Age Bin'][:12]
-                moderate_anaemia = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['Annual Severe Anemia by Age Bin'][:12]
-                severe_anaemia = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['Average Population by Age Bin'][:12]
-                pop = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['New Infections by Age Bin'][:12]
-                new_infect = [x[age] for x in d]
-                d = data[fname]['DataByTimeAndAgeBins']['Mean Log Parasite Density by Age Bin'][:12]
-                log_parasite_density = [x[age] for x in d]
-
-                simdata = pd.DataFrame({'month': range(1, 13),
-                                        'PfPR': pfpr,
-                                        'Cases': clinical_cases,
-                                        'Severe cases': severe_cases,
-                                        'Mild anaemia': mild_anaemia,
-                                        'Moderate anaemia': moderate_anaemia,
-                                        'Severe anaemia': severe_anaemia,
-                                        'New infections': new_infect,
-                                        'Mean Log Parasite Density': log_parasite_density,
-                                        'Pop': pop})
-                simdata['year'] = year
-                simdata['agebin'] = age_bins[age]
-                adf = pd.concat([adf, simdata])
-
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                try:
-                    adf[sweep_var] = simulation.tags[sweep_var]
-                except:
-                    adf[sweep_var] = '-'.join([str(x) for x in simulation.tags[sweep_var]])
-
-        return adf
-
-    def finalize(self, all_data):
-
-        selected = [data for sim, data in all_data.items()]
-        if len(selected) == 0:
-            print("\nWarning: No data have been returned... Exiting...")
-            return
-        df = pd.concat(selected).reset_index(drop=True)
-
-        if not os.path.exists(os.path.join(self.working_dir, self.expt_name)):
-            os.mkdir(os.path.join(self.working_dir, self.expt_name))
-
-        print(f'\nSaving outputs to: {os.path.join(self.working_dir, self.expt_name)}')
-
-        if self.burnin is not None:
-            df = df[df['year'] > self.start_year + self.burnin]
-        df = df.loc[df['agebin'] < 100]  # less than 100 years
-        df.to_csv((os.path.join(self.working_dir, self.expt_name, f'Agebin{self.ipfilter}_PfPR_ClinicalIncidence.csv')),
-                  index=False)
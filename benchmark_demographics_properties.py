@@ -0,0 +1,184 @@
+import os
+import json
+import timeit
+import tempfile
+import numpy as np
+import pandas as pd
+from add_properties_to_demographics import generate_demographics_properties, check_df_valid
+
+"""
+Regression check and timing of generate_demographics_properties and check_df_valid (add_properties_to_demographics.py)
+against the node-by-node and first-violation versions they replaced, on synthetic demographics with an IP and an NP
+for every node: the indexed version on 50k nodes, and identical output to the node-by-node version on 2000 nodes.
+Run `python benchmark_demographics_properties.py`.
+"""
+
+
+def legacy_generate_demographics_properties(refdemo_fname, output_filename='',
+                                            as_overlay=False, IPs=[], NPs=[], df=pd.DataFrame()) :
+    # node-by-node version previously used in add_properties_to_demographics.py
+    if not output_filename :
+        output_filename = refdemo_fname
+
+    with open(refdemo_fname) as fin:
+        demo = json.loads(fin.read())
+    all_nodeids = [x['NodeID'] for x in demo['Nodes']]
+
+    if not as_overlay:
+        if 'IndividualProperties' in demo['Defaults'] :
+            demo['Defaults']['IndividualProperties'] += IPs
+        else :
+            demo['Defaults']['IndividualProperties'] = IPs
+    else:
+        demo = { 'Metadata' : demo['Metadata']
+                 }
+        if IPs:
+            demo['Defaults'] = {'IndividualProperties': IPs}
+    if NPs:
+        if 'NodeProperties' in demo :
+            demo['NodeProperties'] += NPs
+        else :
+            demo['NodeProperties'] = NPs
+
+    if as_overlay:
+        nodeIDs_existing = []
+        demo['Nodes'] = []
+    elif not df.empty:
+        nodeIDs_existing = df['node'].unique()
+
+    if not df.empty and 'NP' in df['Property_Type'].unique() :
+        for NP in df[df['Property_Type'] == 'NP']['Property'].unique():
+            for i, row in df[df['Property'] == NP].iterrows():
+                this_np = '%s:%s' % (row['Property'], row['Property_Value'])
+                if row['node'] not in nodeIDs_existing:
+                    demo['Nodes'].append({'NodeID': row['node'],
+                                          'NodeAttributes': {
+                                              'NodePropertyValues': [this_np]
+                                          }})
+                    nodeIDs_existing.append(row['node'])
+                else:
+                    for node in demo['Nodes']:
+                        if node['NodeID'] == row['node']:
+                            if 'NodePropertyValues' not in node['NodeAttributes']:
+                                node['NodeAttributes']['NodePropertyValues'] = [this_np]
+                            else:
+                                node['NodeAttributes']['NodePropertyValues'].append(this_np)
+
+    if not df.empty and 'IP' in df['Property_Type'].unique() :
+        for (nodeid, prop), gdf in df[df['Property_Type'] == 'IP'].groupby(['node', 'Property']):
+            this_ip = {'Property': prop,
+                       'Values': list(gdf['Property_Value'].values),
+                       'Initial_Distribution': list([float(x) for x in gdf['Initial_Distribution'].values])}
+            if nodeid not in nodeIDs_existing:
+                demo['Nodes'].append({'NodeID': int(nodeid),
+                                      'IndividualProperties': [this_ip]
+                                      })
+                nodeIDs_existing.append(nodeid)
+            else:
+                for node in demo['Nodes']:
+                    if node['NodeID'] == nodeid:
+                        if 'IndividualProperties' not in node:
+                            node['IndividualProperties'] = [this_ip]
+                        else:
+                            node['IndividualProperties'].append(this_ip)
+
+    if as_overlay and not df.empty :
+        missing_nodeids = [x for x in all_nodeids if x not in nodeIDs_existing]
+        for node in missing_nodeids :
+            demo['Nodes'].append({ 'NodeID' : node})
+
+    def default(o):
+        if isinstance(o, np.int64): return int(o)
+        raise TypeError
+
+    with open(output_filename, 'w') as fout:
+        json.dump(demo, fout, sort_keys=True, indent=4, separators=(',', ': '), default=default)
+
+
+def legacy_check_df_valid(df, IPs, NPs) :
+    # first-violation version previously used in add_properties_to_demographics.py
+
+    # also check that values are listed in NPs and IPs?
+    def check_prop_specified(sdf, prop_list, prop_type):
+        p_list = [x['Property'] for x in prop_list]
+        valid = all(x in p_list for x in sdf[sdf['Property_Type'] == prop_type]['Property'].unique())
+        if not valid:
+            print('invalid %s' % prop_type)
+            return False
+        return True
+
+    def check_prop_vals_specified(sdf, prop_list, prop_type):
+        for p, gdf in sdf[sdf['Property_Type'] == prop_type].groupby('Property'):
+            df_vals = gdf['Property_Value'].unique()
+            for item in prop_list:
+                if item['Property'] == p and not all(x in item['Values'] for x in df_vals):
+                    print('invalid value for %s %s' % (prop_type, p))
+                    return False
+        return True
+
+    # check all NPs specified in defaults
+    if not check_prop_specified(df, NPs, 'NP') :
+        return False
+    # check all NP values specified in defaults
+    if not check_prop_vals_specified(df, NPs, 'NP') :
+        return False
+
+    # check all IPs specified in defaults
+    if not check_prop_specified(df, IPs, 'IP') :
+        return False
+    # check all IP values specified in defaults
+    if not check_prop_vals_specified(df, IPs, 'IP') :
+        return False
+
+    # check all IP initial distributions sum to 1
+    for (nodeid, prop), gdf in df[df['Property_Type'] == 'IP'].groupby(['node', 'Property']):
+        if np.sum(gdf['Initial_Distribution']) != 1 :
+            print('Node %d, IP %s initial distribution invalid' % (nodeid, prop))
+            return False
+    return True
+
+
+def synthetic_properties(nnodes, tmp_dir):
+    """Demographics file with nnodes nodes and a property table with an IP (2 values) and an NP for every node"""
+    demo_fname = os.path.join(tmp_dir, f'demographics_{nnodes}.json')
+    demo = {'Metadata': {'NodeCount': nnodes}, 'Defaults': {'NodeAttributes': {}},
+            'Nodes': [{'NodeID': i, 'NodeAttributes': {'InitialPopulation': 1000}} for i in range(1, nnodes + 1)]}
+    with open(demo_fname, 'w') as fout:
+        json.dump(demo, fout)
+    nodes = np.arange(1, nnodes + 1)
+    ip_df = pd.DataFrame({'node': np.repeat(nodes, 2), 'Property': 'Access', 'Property_Type': 'IP',
+                          'Property_Value': np.tile(['Low', 'High'], nnodes),
+                          'Initial_Distribution': np.tile([0.3, 0.7], nnodes)})
+    np_df = pd.DataFrame({'node': nodes, 'Property': 'Region', 'Property_Type': 'NP',
+                          'Property_Value': np.where(nodes % 2, 'North', 'South'), 'Initial_Distribution': 1.0})
+    IPs = [{'Property': 'Access', 'Values': ['Low', 'High'], 'Initial_Distribution': [0.5, 0.5], 'Transitions': []}]
+    NPs = [{'Property': 'Region', 'Values': ['North', 'South'], 'Initial_Distribution': [0.5, 0.5],
+            'Transitions': []}]
+    return demo_fname, IPs, NPs, pd.concat([np_df, ip_df], ignore_index=True)
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for nnodes in [2000, 50000]:
+            demo_fname, IPs, NPs, df = synthetic_properties(nnodes, tmp_dir)
+            for as_overlay in [False, True]:
+                out_fname = os.path.join(tmp_dir, 'out.json')
+                t = timeit.timeit(lambda: generate_demographics_properties(demo_fname, out_fname, as_overlay,
+                                                                           IPs, NPs, df), number=1)
+                line = f'{nnodes} nodes, as_overlay={as_overlay}: indexed {t:.2f} s'
+                if nnodes <= 2000:
+                    legacy_fname = os.path.join(tmp_dir, 'legacy.json')
+                    t_legacy = timeit.timeit(lambda: legacy_generate_demographics_properties(
+                        demo_fname, legacy_fname, as_overlay, IPs, NPs, df), number=1)
+                    with open(out_fname) as f1, open(legacy_fname) as f2:
+                        assert f1.read() == f2.read()
+                    line += f', node-by-node {t_legacy:.2f} s (identical output)'
+                print(line)
+
+            t = timeit.timeit(lambda: check_df_valid(df, IPs, NPs), number=1)
+            line = f'{nnodes} nodes, check_df_valid: vectorized {t:.2f} s'
+            if nnodes <= 2000:
+                t_legacy = timeit.timeit(lambda: legacy_check_df_valid(df, IPs, NPs), number=1)
+                assert check_df_valid(df, IPs, NPs) == legacy_check_df_valid(df, IPs, NPs)
+                line += f', first-violation version {t_legacy:.2f} s (same result)'
+            print(line)
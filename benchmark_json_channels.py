@@ -0,0 +1,51 @@
+import os
+import json
+import timeit
+import tempfile
+import numpy as np
+from json_channels import read_channels
+
+"""
+Regression check and timing of read_channels (json_channels.py) against json.load on a synthetic InsetChart with
+float channels, integer channels and integer channels containing NaN and Infinity (written by EMOD and by json.dump).
+Run `python benchmark_json_channels.py`.
+"""
+
+
+def synthetic_report(ndays=365 * 20, nchannels=30, seed=0):
+    rng = np.random.default_rng(seed)
+    channels = {f'Float {i}': {'Data': list(rng.random(ndays)), 'Units': ''} for i in range(nchannels)}
+    channels['Integer'] = {'Data': [int(x) for x in rng.integers(0, 100, ndays)], 'Units': 'count'}
+    channels['Integer with NaN'] = {'Data': [1, float('nan'), 3], 'Units': ''}
+    channels['Integer with Infinity'] = {'Data': [1, float('inf'), -float('inf')], 'Units': ''}
+    return {'Header': {'Timesteps': ndays, 'Channels': len(channels)}, 'Channels': channels}
+
+
+def same_data(expected, actual):
+    expected = np.asarray(expected, dtype=float)
+    return expected.shape == actual.shape and np.array_equal(expected, actual.astype(float), equal_nan=True)
+
+
+if __name__ == '__main__':
+    report = synthetic_report()
+    selected = ['Float 0', 'Integer', 'Integer with NaN', 'Integer with Infinity']
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fname = os.path.join(tmp_dir, 'InsetChart.json')
+        with open(fname, 'w') as fout:
+            json.dump(report, fout)
+
+        data = read_channels(fname, selected)
+        for channel in selected:
+            assert same_data(report['Channels'][channel]['Data'], data['Channels'][channel]['Data']), channel
+            assert data['Channels'][channel]['Units'] == report['Channels'][channel]['Units'], channel
+        assert data['Channels']['Integer']['Data'].dtype == np.int64
+
+        def load_all():
+            with open(fname) as fin:
+                return json.load(fin)
+
+        t_json = timeit.timeit(load_all, number=3) / 3
+        t_selected = timeit.timeit(lambda: read_channels(fname, selected), number=3) / 3
+        print(f'{len(report["Channels"])} channels of {report["Header"]["Timesteps"]} days: outputs match')
+        print(f'json.load: {t_json * 1000:.0f} ms, read_channels of {len(selected)} channels: '
+              f'{t_selected * 1000:.0f} ms ({t_json / t_selected:.0f}x)')
@@ -0,0 +1,68 @@
+import timeit
+import numpy as np
+import pandas as pd
+from analyzer_collection import fix_excess_severe_treatment
+
+"""
+Regression check and timing of fix_excess_severe_treatment (analyzer_collection.py) against the row-by-row loop
+it replaced in MonthlySevereTreatedByAgeAnalyzer and MonthlyAgebinSevereTreatedAnalyzer, on a synthetic merged frame
+of monthly severe cases and treatments per Run_Number and sweep value.
+Run `python benchmark_severe_treatment.py`.
+"""
+
+treated_col = 'Num_U5_Received_Severe_Treatment'
+cases_col = 'num severe cases U5'
+
+
+def legacy_fix_excess_severe_treatment(merged_df, sweep_variables, start_year):
+    """Loop of the analyzers before fix_excess_severe_treatment (the non-January branch subtracted and re-added the
+    same excess and is kept as it was)"""
+    merged_df['excess sev treat'] = merged_df[treated_col] - merged_df[cases_col]
+    merged_df['sweep_id'] = merged_df.groupby(sweep_variables, sort=False).ngroup().apply('{:010}'.format)
+
+    for (rn, sweep), rdf in merged_df.groupby(['Run_Number', 'sweep_id']):
+        for r, row in rdf.iterrows():
+            if row['excess sev treat'] < 1:
+                continue
+            first_month = (merged_df['year'] == start_year) & (merged_df['month'] == 1) & (
+                    merged_df['Run_Number'] == rn) & (merged_df['sweep_id'] == sweep)
+            if row['year'] == start_year and row['month'] == 1:
+                merged_df.loc[first_month, treated_col] = np.sum(merged_df[first_month][cases_col])
+            else:
+                excess = row['excess sev treat']
+                merged_df.loc[first_month, treated_col] = merged_df.loc[first_month, treated_col] - excess
+                merged_df.loc[first_month, treated_col] = merged_df.loc[first_month, treated_col] + excess
+    merged_df['excess sev treat'] = merged_df[treated_col] - merged_df[cases_col]
+    merged_df.loc[merged_df['excess sev treat'] > 0.5, treated_col] = \
+        merged_df.loc[merged_df['excess sev treat'] > 0.5, cases_col]
+
+    del merged_df['excess sev treat']
+    del merged_df['sweep_id']
+    return merged_df
+
+
+def synthetic_frame(n_runs=3, n_sweep=10, start_year=2020, n_years=3, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = [(rn, cov, year, month) for rn in range(n_runs) for cov in np.linspace(0, 1, n_sweep)
+            for year in range(start_year, start_year + n_years) for month in range(1, 13)]
+    df = pd.DataFrame(rows, columns=['Run_Number', 'cm_cov', 'year', 'month'])
+    df[cases_col] = rng.random(len(df)) * 5
+    df[treated_col] = rng.integers(0, 9, len(df)).astype(float)
+    return df
+
+
+if __name__ == '__main__':
+    start_year = 2020
+    sweep_variables = ['Run_Number', 'cm_cov']
+    for n_sweep in [3, 40]:
+        df = synthetic_frame(n_sweep=n_sweep, start_year=start_year)
+        legacy = legacy_fix_excess_severe_treatment(df.copy(), sweep_variables, start_year)
+        vectorized = fix_excess_severe_treatment(df.copy(), treated_col, cases_col, sweep_variables, start_year)
+        pd.testing.assert_frame_equal(legacy, vectorized, check_exact=False, rtol=1e-12)
+
+        t_legacy = timeit.timeit(lambda: legacy_fix_excess_severe_treatment(df.copy(), sweep_variables, start_year),
+                                 number=1)
+        t_vectorized = timeit.timeit(lambda: fix_excess_severe_treatment(df.copy(), treated_col, cases_col,
+                                                                         sweep_variables, start_year), number=3) / 3
+        print(f'{len(df)} rows: outputs match, row-by-row loop {t_legacy * 1000:.0f} ms, '
+              f'vectorized {t_vectorized * 1000:.1f} ms ({t_legacy / t_vectorized:.0f}x)')
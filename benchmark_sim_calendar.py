@@ -0,0 +1,46 @@
+import datetime
+import timeit
+import numpy as np
+import pandas as pd
+from sim_calendar import DAYS_PER_YEAR, add_calendar_columns
+
+"""
+Regression check and timing of add_calendar_columns (sim_calendar.py) against the row-by-row strptime/apply version
+it replaced in analyzer_collection.py, on 20 years of daily output of one simulation.
+Run `python benchmark_sim_calendar.py`.
+"""
+
+
+def legacy_calendar_columns(df, start_year):
+    """Row-by-row version previously used in analyzer_collection.py"""
+    def monthparser(x):
+        if x == 0:
+            return 12
+        else:
+            return datetime.datetime.strptime(str(x), '%j').month
+
+    df['Day'] = df['Time'] % 365
+    df['Month'] = df['Day'].apply(lambda x: monthparser((x + 1) % 365))
+    df['Year'] = df['Time'].apply(lambda x: int(x / 365) + start_year)
+    df['date'] = df.apply(lambda x: datetime.date(int(x['Year']), int(x['Month']), 1), axis=1)
+    return df
+
+
+if __name__ == '__main__':
+    # Benchmark per simulation: 20 years of daily output with 5 channels
+    nyears, start_year = 20, 2022
+    simdata = pd.DataFrame(np.random.rand(nyears * DAYS_PER_YEAR, 5), columns=[f'ch{i}' for i in range(5)])
+    simdata['Time'] = simdata.index
+
+    legacy = legacy_calendar_columns(simdata.copy(), start_year)
+    vectorized = add_calendar_columns(simdata.copy(), start_year, date='month')
+    assert (legacy['Month'].values == vectorized['Month'].values).all()
+    assert (legacy['Year'].values == vectorized['Year'].values).all()
+    assert (pd.to_datetime(legacy['date']).values == vectorized['date'].values).all()
+
+    n = 3
+    t_legacy = timeit.timeit(lambda: legacy_calendar_columns(simdata.copy(), start_year), number=n) / n
+    t_vectorized = timeit.timeit(lambda: add_calendar_columns(simdata.copy(), start_year, date='month'), number=n) / n
+    print(f'{len(simdata)} rows per simulation')
+    print(f'row-by-row (strptime/apply): {t_legacy * 1000:.1f} ms per simulation')
+    print(f'vectorized (lookup tables) : {t_vectorized * 1000:.1f} ms per simulation ({t_legacy / t_vectorized:.0f}x)')
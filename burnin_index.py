@@ -0,0 +1,98 @@
+import os
+import json
+from sim_calendar import DAYS_PER_YEAR
+
+"""
+Index of the simulations of a burn-in experiment for pick-up scripts, replacing the ser_df lookups
+ser_df[ser_df.Run_Number == seed].outpath.iloc[0].
+The simulation ids, paths and tags are retrieved once and cached in simulation_outputs/burnin_index/<burnin_id>.json,
+and each simulation is indexed by the values of its key_tags (e.g. Run_Number and a burn-in coverage), so looking up
+the serialized population of a pick-up is a dictionary access. validate() checks once that the state file of the
+pull year exists for every burn-in simulation, so that missing states fail before the pick-up is submitted:
+
+    index = BurninIndex(burnin_id, key_tags=['Run_Number']).validate(pull_year)
+    ModFn(DTKConfigBuilder.set_param, 'Serialized_Population_Path', index.path(Run_Number=seed))
+"""
+
+index_dir = os.path.join('simulation_outputs', 'burnin_index')
+
+
+def day_filename(day):
+    """Name of the serialized population file written on day of a simulation"""
+    return 'state-%05d.dtk' % day
+
+
+def state_filename(pull_year):
+    """Name of the serialized population file written at the end of year pull_year of the burn-in"""
+    return day_filename(pull_year * DAYS_PER_YEAR)
+
+
+def retrieve_burnin(burnin_id):
+    from simtools.Utilities.Experiments import retrieve_experiment
+    expt = retrieve_experiment(burnin_id)
+    return [{'sim_id': str(sim.id), 'path': sim.get_path(), 'tags': dict(sim.tags)} for sim in expt.simulations]
+
+
+class BurninIndex:
+
+    def __init__(self, burnin_id, key_tags=('Run_Number',), cache_dir=index_dir, refresh=False):
+        self.burnin_id = burnin_id
+        self.key_tags = list(key_tags)
+        self.cache_file = os.path.join(cache_dir, f'{burnin_id}.json')
+        if refresh or not os.path.exists(self.cache_file):
+            self.simulations = retrieve_burnin(burnin_id)
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(self.cache_file + '.tmp', 'w') as f:
+                json.dump(self.simulations, f, default=str)
+            os.replace(self.cache_file + '.tmp', self.cache_file)
+        else:
+            with open(self.cache_file) as f:
+                self.simulations = json.load(f)
+
+        self.index = {}
+        for sim in self.simulations:
+            missing = [k for k in self.key_tags if k not in sim['tags']]
+            if missing:
+                raise KeyError(f'Burn-in simulation {sim["sim_id"]} has no tag {missing}')
+            key = self._key([sim['tags'][k] for k in self.key_tags])
+            if key in self.index:
+                raise ValueError(f'Burn-in tags {self.key_tags} do not identify a single simulation: '
+                                 f'{key} is shared by {self.index[key]["sim_id"]} and {sim["sim_id"]}')
+            self.index[key] = sim
+
+    def __len__(self):
+        return len(self.index)
+
+    @staticmethod
+    def _key(values):
+        # tags may come back as numbers or strings depending on the platform
+        return tuple(str(v) for v in values)
+
+    def keys(self):
+        """Tag values of the burn-in simulations, as {tag: value} dictionaries"""
+        return [{k: sim['tags'][k] for k in self.key_tags} for sim in self.index.values()]
+
+    def lookup(self, *values, **tags):
+        """Burn-in simulation (sim_id, path, tags) with key tag values given in key_tags order or by name"""
+        if tags:
+            values = [tags[k] for k in self.key_tags]
+        if len(values) != len(self.key_tags):
+            raise ValueError(f'Expected values of {self.key_tags}, got {values}')
+        key = self._key(values)
+        if key not in self.index:
+            raise KeyError(f'No burn-in simulation with {dict(zip(self.key_tags, key))} in {self.burnin_id}')
+        return self.index[key]
+
+    def path(self, *values, **tags):
+        """Serialized_Population_Path of a pick-up from the burn-in simulation with the given key tag values"""
+        return os.path.join(self.lookup(*values, **tags)['path'], 'output')
+
+    def validate(self, pull_year):
+        """Check that every burn-in simulation serialized its population at the end of year pull_year"""
+        fname = state_filename(pull_year)
+        missing = [sim['sim_id'] for sim in self.index.values()
+                   if not os.path.exists(os.path.join(sim['path'], 'output', fname))]
+        if missing:
+            raise FileNotFoundError(f'{len(missing)} of {len(self)} burn-in simulations of {self.burnin_id} '
+                                    f'have no {fname}: {missing}')
+        return self
@@ -0,0 +1,345 @@
+import os
+import re
+import sys
+import json
+import datetime
+import numpy as np
+import pandas as pd
+from sim_calendar import DAYS_PER_YEAR, month_of_day, month_start_date
+from table_io import write_table
+
+"""
+Reader for EMOD climate input files (e.g. input/Namawala/Namawala_single_node_rainfall_daily.bin).
+The .bin.json header gives NodeCount, DatavalueCount and NodeOffsets, a hex string with 16 characters per node
+(8 for the NodeID, 8 for the byte offset of the node's values in the .bin file), and the .bin file holds DatavalueCount
+float32 values per node. ClimateFile memory-maps the .bin file as a (node x value) array, so that nodes and date ranges
+of large multi-node files can be read without loading the whole file. Climate years have 365 days as in EMOD.
+
+    climate = ClimateFile(os.path.join('input', 'Namawala', 'Namawala_single_node_rainfall_daily.bin'))
+    climate.node_ids, climate.data.shape
+    rain = climate.select(nodes=[340461476], start='1995-01-01', end='1995-12-31')
+    df = climate.to_frame(start='1995-01-01', end='1995-12-31')
+
+New climate files can be derived locally from existing ones instead of requesting them from ClimateGenerator:
+derive_climate() selects (and renames or replicates) nodes, extracts years and scales/offsets values (e.g. rainfall
+for sensitivity sweeps), merge_climate() combines node sets, and climate_for_nodes() gives every node of a
+demographics file the climate of a source node. Each output is written with a single write of the (node x value) array.
+
+    derive_climate(climate, 'Namawala_rainfall_x1.2_daily.bin', start_year=1995, end_year=1999, scale=1.2)
+
+Before launching simulations, validate_climate() checks a file against its header (NodeOffsets, NodeCount,
+DatavalueCount, file size) and for NaN and out-of-range values, and monthly_climatology() summarizes each node by
+calendar month. Run `python climate_files.py input/Namawala` to check all climate files of a folder and write their
+monthly climatologies to climate_summary.csv in that folder.
+"""
+
+CLIMATE_DTYPE = np.dtype('<f4')
+# plausible range of the values of each climate variable (matched on the file name)
+VALUE_RANGES = {'air_temperature': (-50, 60), 'land_temperature': (-50, 70), 'rainfall': (0, 500),
+                'relative_humidity': (0, 1)}
+# first day index 0-364 of each month in a 365-day year
+MONTH_START_DAY = np.cumsum([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+
+
+def header_fname(fname):
+    return fname + '.json'
+
+
+def read_header(fname):
+    with open(header_fname(fname)) as f:
+        return json.load(f)
+
+
+def parse_node_offsets(node_offsets):
+    """NodeIDs and byte offsets (both uint32) of a NodeOffsets hex string"""
+    values = np.frombuffer(bytes.fromhex(node_offsets), dtype='>u4').reshape(-1, 2)
+    return values[:, 0].astype(np.uint32), values[:, 1].astype(np.uint32)
+
+
+def format_node_offsets(node_ids, offsets):
+    """NodeOffsets hex string of NodeIDs and byte offsets"""
+    return np.column_stack([node_ids, offsets]).astype('>u4').tobytes().hex().upper()
+
+
+def day_index(date, start_year):
+    """Index of a date in daily climate data starting on January 1st of start_year (Feb 29 counts as Feb 28)"""
+    date = pd.Timestamp(date)
+    day = MONTH_START_DAY[date.month - 1] + min(date.day, 28 if date.month == 2 else 31) - 1
+    return (date.year - start_year) * DAYS_PER_YEAR + int(day)
+
+
+class ClimateFile:
+
+    def __init__(self, fname, start_year=None):
+        self.fname = fname
+        header = read_header(fname)
+        self.metadata = header['Metadata']
+        self.node_count = int(self.metadata['NodeCount'])
+        self.value_count = int(self.metadata['DatavalueCount'])
+        self.resolution = self.metadata.get('UpdateResolution', 'CLIMATE_UPDATE_DAY')
+        self.node_ids, self.offsets = parse_node_offsets(header['NodeOffsets'])
+        if start_year is None:
+            years = re.match(r'\s*(\d{4})', str(self.metadata.get('OriginalDataYears', '')))
+            start_year = int(years.group(1)) if years else None
+        self.start_year = start_year
+
+        node_bytes = self.value_count * CLIMATE_DTYPE.itemsize
+        if len(self.node_ids) != self.node_count:
+            raise ValueError(f'{fname}: NodeOffsets has {len(self.node_ids)} nodes, NodeCount is {self.node_count}')
+        if np.any(self.offsets % node_bytes):
+            raise ValueError(f'{fname}: NodeOffsets are not multiples of DatavalueCount values')
+        file_nodes = os.path.getsize(fname) // node_bytes
+        self.rows = (self.offsets // node_bytes).astype(np.int64)
+        if np.any(self.rows >= file_nodes):
+            raise ValueError(f'{fname}: NodeOffsets point beyond the end of the file ({file_nodes} nodes)')
+        self._file_data = np.memmap(fname, dtype=CLIMATE_DTYPE, mode='r', shape=(file_nodes, self.value_count))
+        self._node_index = pd.Index(self.node_ids)
+
+    @property
+    def data(self):
+        """(node x value) array in NodeOffsets order, a view of the memory-mapped file when nodes are stored in
+        this order (as written by EMOD tools), a copy otherwise"""
+        if len(self.rows) == self._file_data.shape[0] and np.array_equal(self.rows, np.arange(len(self.rows))):
+            return self._file_data
+        return self._file_data[self.rows]
+
+    def node_positions(self, nodes):
+        """Positions of NodeIDs in the header"""
+        positions = self._node_index.get_indexer(np.asarray(nodes, dtype=np.uint32))
+        if np.any(positions < 0):
+            raise KeyError(f'Nodes not in {self.fname}: {np.asarray(nodes)[positions < 0].tolist()}')
+        return positions
+
+    def value_range(self, start=None, end=None):
+        """Slice of the values between the dates start and end (included), daily files only"""
+        if start is None and end is None:
+            return slice(None)
+        if self.resolution != 'CLIMATE_UPDATE_DAY':
+            raise ValueError(f'Date ranges are only supported for daily climate files, not {self.resolution}')
+        if self.start_year is None:
+            raise ValueError(f'Unknown start year of {self.fname}, set start_year')
+        first = 0 if start is None else max(day_index(start, self.start_year), 0)
+        last = self.value_count if end is None else min(day_index(end, self.start_year) + 1, self.value_count)
+        return slice(first, max(first, last))
+
+    def dates(self, start=None, end=None):
+        """Dates (datetime64[D]) of the daily values between start and end"""
+        days = np.arange(self.value_count)[self.value_range(start, end)]
+        day, month = days % DAYS_PER_YEAR, month_of_day(days % DAYS_PER_YEAR)
+        first = month_start_date(self.start_year + days // DAYS_PER_YEAR, month)
+        return first + (day - MONTH_START_DAY[month - 1]).astype('timedelta64[D]')
+
+    def select(self, nodes=None, start=None, end=None):
+        """(node x value) array of the given NodeIDs (all nodes if None) between the dates start and end.
+        Only the selected values are read from the file."""
+        values = self.value_range(start, end)
+        if nodes is None:
+            return self.data[:, values]
+        return self._file_data[self.rows[self.node_positions(nodes)], values]
+
+    def to_frame(self, nodes=None, start=None, end=None, value_name='value'):
+        """Long format (node_id, date, value) of the selection, daily files only"""
+        values = self.select(nodes, start, end)
+        node_ids = self.node_ids if nodes is None else np.asarray(nodes, dtype=np.uint32)
+        dates = self.dates(start, end)
+        return pd.DataFrame({'node_id': np.repeat(node_ids, len(dates)),
+                             'date': np.tile(dates, len(node_ids)),
+                             value_name: np.asarray(values).ravel()})
+
+
+def write_climate(fname, node_ids, data, metadata):
+    """Write the (node x value) data of node_ids to fname and its header, nodes stored in node_ids order.
+    metadata is copied from the source file(s), with the node and value counts updated."""
+    data = np.ascontiguousarray(data, dtype=CLIMATE_DTYPE)
+    node_ids = np.asarray(node_ids, dtype=np.uint32)
+    if data.ndim != 2 or data.shape[0] != len(node_ids):
+        raise ValueError(f'Expected a (node x value) array for {len(node_ids)} nodes, got shape {data.shape}')
+    if len(np.unique(node_ids)) != len(node_ids):
+        raise ValueError(f'Duplicate NodeIDs in {fname}')
+    offsets = np.arange(len(node_ids), dtype=np.int64) * data.shape[1] * CLIMATE_DTYPE.itemsize
+    if len(offsets) and offsets[-1] >= 2 ** 32:
+        raise ValueError(f'{fname} too large for 32 bit NodeOffsets')
+
+    metadata = dict(metadata)
+    for key in ['NodeCount', 'OffsetEntryCount', 'NumberDTKNodes', 'WeatherCellCount']:
+        if key in metadata or key == 'NodeCount':
+            metadata[key] = len(node_ids)
+    for key in ['DatavalueCount', 'DatavaluePerCell']:
+        if key in metadata or key == 'DatavalueCount':
+            metadata[key] = data.shape[1]
+    metadata['DateCreated'] = datetime.datetime.now().strftime('%a %b %d %H:%M:%S %Y')
+    metadata['Tool'] = 'climate_files.py'
+
+    with open(fname, 'wb') as f:
+        f.write(data.tobytes())
+    with open(header_fname(fname), 'w') as f:
+        json.dump({'Metadata': metadata, 'NodeOffsets': format_node_offsets(node_ids, offsets)}, f, indent=4)
+    return ClimateFile(fname)
+
+
+def derive_climate(climate, fname, nodes=None, node_ids=None, start_year=None, end_year=None, scale=1, offset=0,
+                   minimum=None):
+    """Climate file with the values of nodes (NodeIDs of climate, may repeat; all if None) stored as node_ids
+    (default: the same NodeIDs), restricted to the years start_year-end_year, scaled, offset and clipped at minimum
+    (e.g. 0 for rainfall)"""
+    start = None if start_year is None else f'{start_year}-01-01'
+    end = None if end_year is None else f'{end_year}-12-31'
+    values = climate.value_range(start, end)
+    data = np.asarray(climate.select(nodes, start, end), dtype=CLIMATE_DTYPE)
+    if scale != 1 or offset != 0:
+        data = data * CLIMATE_DTYPE.type(scale) + CLIMATE_DTYPE.type(offset)
+    if minimum is not None:
+        data = np.maximum(data, CLIMATE_DTYPE.type(minimum))
+    if node_ids is None:
+        node_ids = climate.node_ids if nodes is None else nodes
+
+    metadata = dict(climate.metadata)
+    if values != slice(None):
+        first, last = values.indices(climate.value_count)[:2]
+        metadata['OriginalDataYears'] = f'{climate.start_year + first // DAYS_PER_YEAR}-' \
+                                        f'{climate.start_year + (last - 1) // DAYS_PER_YEAR}'
+    if scale != 1 or offset != 0:
+        metadata['DataProvenance'] = f'{metadata.get("DataProvenance", "")} (scaled by {scale}, offset by {offset})'
+    return write_climate(fname, node_ids, data, metadata)
+
+
+def merge_climate(climates, fname):
+    """Climate file with the nodes of all climates (same number of values, distinct NodeIDs)"""
+    for climate in climates[1:]:
+        if climate.value_count != climates[0].value_count or climate.resolution != climates[0].resolution:
+            raise ValueError(f'{climate.fname} does not have the values of {climates[0].fname}')
+    node_ids = np.concatenate([climate.node_ids for climate in climates])
+    data = np.concatenate([climate.data for climate in climates])
+    return write_climate(fname, node_ids, data, climates[0].metadata)
+
+
+def climate_for_nodes(demo_fname, source_fname, output_fname, source_nodes=None, **kwargs):
+    """Climate file for all nodes of a demographics file from an existing climate file, every node getting the
+    climate of its source node (NodeIDs of the source file, default its first node); kwargs as in derive_climate"""
+    with open(demo_fname) as f:
+        node_ids = [node['NodeID'] for node in json.load(f)['Nodes']]
+    climate = ClimateFile(source_fname)
+    if source_nodes is None:
+        source_nodes = np.repeat(climate.node_ids[0], len(node_ids))
+    return derive_climate(climate, output_fname, nodes=source_nodes, node_ids=node_ids, **kwargs)
+
+
+def default_value_range(fname):
+    return ([v for k, v in VALUE_RANGES.items() if k in os.path.basename(fname)] + [None])[0]
+
+
+def _issues_frame(issues):
+    df = pd.DataFrame(issues, columns=['file', 'check', 'node_id', 'count', 'message'])
+    return df.astype({'node_id': 'Int64', 'count': 'Int64'})
+
+
+def validate_climate(fname, value_range=None, chunk_values=1 << 24):
+    """Issues (file, check, node_id, count, message) of a climate file: header and NodeOffsets inconsistent with
+    NodeCount, DatavalueCount or the file size, and per node NaN values and values outside value_range (default from
+    VALUE_RANGES). Values are checked in chunks of nodes of about chunk_values values. No rows = valid file."""
+    issues = []
+
+    def issue(check, message, node_id=None, count=None):
+        issues.append({'file': fname, 'check': check, 'node_id': node_id, 'count': count, 'message': message})
+
+    try:
+        header = read_header(fname)
+        node_count = int(header['Metadata']['NodeCount'])
+        value_count = int(header['Metadata']['DatavalueCount'])
+        node_ids, offsets = parse_node_offsets(header['NodeOffsets'])
+    except (OSError, ValueError, KeyError) as e:
+        issue('header', f'Invalid header {header_fname(fname)}: {type(e).__name__} {e}')
+        return _issues_frame(issues)
+
+    node_bytes = value_count * CLIMATE_DTYPE.itemsize
+    size = os.path.getsize(fname)
+    if len(node_ids) != node_count:
+        issue('node_count', f'NodeOffsets has {len(node_ids)} nodes, NodeCount is {node_count}')
+    if len(np.unique(node_ids)) != len(node_ids):
+        issue('node_ids', 'Duplicate NodeIDs in NodeOffsets', count=len(node_ids) - len(np.unique(node_ids)))
+    if size != node_count * node_bytes:
+        issue('size', f'File has {size / CLIMATE_DTYPE.itemsize:.0f} values, NodeCount x DatavalueCount is '
+                      f'{node_count * value_count}')
+    misaligned = (offsets % node_bytes != 0) | (offsets.astype(np.int64) + node_bytes > size)
+    for node_id, node_offset in zip(node_ids[misaligned], offsets[misaligned]):
+        issue('offset', f'Offset {node_offset} is not the start of DatavalueCount values in the file', node_id)
+    if len(np.unique(offsets)) != len(offsets):
+        issue('offset', 'Several nodes share the same offset', count=len(offsets) - len(np.unique(offsets)))
+    if misaligned.any() or value_count == 0:
+        return _issues_frame(issues)
+
+    value_range = value_range or default_value_range(fname)
+    data = np.memmap(fname, dtype=CLIMATE_DTYPE, mode='r', shape=(size // node_bytes, value_count))
+    rows = (offsets // node_bytes).astype(np.int64)
+    chunk = max(1, chunk_values // value_count)
+    for i in range(0, len(rows), chunk):
+        block = data[rows[i:i + chunk]]
+        counts = {'nan': (~np.isfinite(block)).sum(axis=1)}
+        if value_range is not None:
+            counts['range'] = ((block < value_range[0]) | (block > value_range[1])).sum(axis=1)
+        for check, count in counts.items():
+            for j in np.flatnonzero(count):
+                message = 'NaN or infinite values' if check == 'nan' else f'Values outside {value_range}'
+                issue(check, message, node_ids[i + j], int(count[j]))
+    return _issues_frame(issues)
+
+
+def monthly_climatology(climate, nodes=None, chunk_values=1 << 24):
+    """Per node and calendar month over all (complete) years of a daily climate file: mean, standard deviation,
+    minimum and maximum of the daily values and mean monthly total"""
+    if climate.resolution != 'CLIMATE_UPDATE_DAY':
+        raise ValueError(f'Monthly climatology needs daily values, {climate.fname} is {climate.resolution}')
+    years = climate.value_count // DAYS_PER_YEAR
+    if years == 0:
+        raise ValueError(f'{climate.fname} has less than a year of values')
+    if climate.value_count % DAYS_PER_YEAR:
+        print(f'\nWarning: {climate.fname} does not have complete years, using the first {years} years')
+    node_ids = climate.node_ids if nodes is None else np.asarray(nodes, dtype=np.uint32)
+    days_in_month = np.diff(np.append(MONTH_START_DAY, DAYS_PER_YEAR))
+
+    frames = []
+    chunk = max(1, chunk_values // climate.value_count)
+    for i in range(0, len(node_ids), chunk):
+        block = climate.select(node_ids[i:i + chunk])[:, :years * DAYS_PER_YEAR]
+        block = np.asarray(block, dtype=np.float64).reshape(-1, years, DAYS_PER_YEAR)
+        sums = np.add.reduceat(block, MONTH_START_DAY, axis=2).sum(axis=1)
+        sumsq = np.add.reduceat(block ** 2, MONTH_START_DAY, axis=2).sum(axis=1)
+        n = days_in_month * years
+        mean = sums / n
+        frames.append(pd.DataFrame({
+            'node_id': np.repeat(node_ids[i:i + chunk], 12),
+            'month': np.tile(np.arange(1, 13), len(block)),
+            'mean': mean.ravel(),
+            'std': np.sqrt(np.maximum(sumsq / n - mean ** 2, 0) * n / (n - 1)).ravel(),
+            'min': np.minimum.reduceat(block, MONTH_START_DAY, axis=2).min(axis=1).ravel(),
+            'max': np.maximum.reduceat(block, MONTH_START_DAY, axis=2).max(axis=1).ravel(),
+            'monthly_total': (sums / years).ravel()}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def check_climate_folder(folder, output_format='csv'):
+    """Validate all climate files of a folder and write the monthly climatology of the valid daily files to
+    folder/climate_summary.csv (variable = file name without _daily.bin). Returns the issues found."""
+    fnames = sorted(os.path.join(folder, x) for x in os.listdir(folder) if x.endswith('.bin'))
+    issues = pd.concat([validate_climate(fname) for fname in fnames], ignore_index=True)
+    summaries = []
+    for fname in fnames:
+        if (issues['file'] == fname).any():
+            continue
+        climate = ClimateFile(fname)
+        if climate.resolution == 'CLIMATE_UPDATE_DAY' and climate.value_count >= DAYS_PER_YEAR:
+            summary = monthly_climatology(climate)
+            summary.insert(0, 'variable', re.sub(r'(_daily)?\.bin$', '', os.path.basename(fname)))
+            summaries.append(summary)
+    if summaries:
+        write_table(pd.concat(summaries, ignore_index=True), os.path.join(folder, 'climate_summary.csv'),
+                    output_format, categorical_columns=['variable'])
+    return issues
+
+
+if __name__ == '__main__':
+    climate_issues = check_climate_folder(sys.argv[1])
+    if len(climate_issues):
+        print(climate_issues.to_string(index=False))
+        sys.exit(1)
+    print(f'All climate files in {sys.argv[1]} are valid')
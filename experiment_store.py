@@ -0,0 +1,131 @@
+import os
+import json
+import shutil
+import pandas as pd
+
+"""
+Columnar store of all analyzer outputs of an experiment (requires pyarrow).
+Analyzers created with store=True write each output table as a report of the store under working_dir/expt_name/store,
+partitioned by year (one Parquet file per report and year, report/year=<year>/part.parquet) next to a table of the
+analyzed simulations and their tags. Reports can then be read and joined for selected years and sweep values without
+reparsing the csv files:
+
+    store = ExperimentStore(os.path.join(working_dir, expt_name))
+    store.reports()
+    df = store.query(['U5_PfPR_ClinicalIncidence', 'monthly_transmission_report_all_years'],
+                     on=['year', 'month', 'itn_coverage'], years=[2021], where={'itn_coverage': [0.4, 0.8]},
+                     rename={'Year': 'year', 'Month': 'month'})
+"""
+
+YEAR_COLUMNS = ['year', 'Year']
+
+
+class ExperimentStore:
+
+    def __init__(self, expt_dir):
+        self.path = os.path.join(expt_dir, 'store')
+
+    def report_path(self, report):
+        return os.path.join(self.path, report)
+
+    def reports(self):
+        if not os.path.exists(self.path):
+            return []
+        return sorted([x for x in os.listdir(self.path) if os.path.isdir(self.report_path(x))])
+
+    def write_report(self, report, df):
+        """Write (replace) a report, partitioned by its year column if it has one"""
+        df = df.reset_index(drop=True)
+        tmp_path = self.report_path(report) + '.tmp'
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        year_col = ([x for x in YEAR_COLUMNS if x in df.columns] + [None])[0]
+        if year_col is None:
+            df.to_parquet(os.path.join(tmp_path, 'part.parquet'), index=False)
+        else:
+            for year, ydf in df.groupby(year_col, sort=True):
+                # year columns are float after merges with missing values, partitions are named by the integer year
+                partition = os.path.join(tmp_path, f'{year_col}={int(year)}')
+                os.makedirs(partition)
+                ydf.to_parquet(os.path.join(partition, 'part.parquet'), index=False)
+
+        if os.path.exists(self.report_path(report)):
+            shutil.rmtree(self.report_path(report))
+        os.replace(tmp_path, self.report_path(report))
+
+    def partitions(self, report):
+        """(year, file) of each partition of a report, year is None for reports without year column"""
+        path = self.report_path(report)
+        if not os.path.exists(path):
+            raise KeyError(f'Report {report} not in store, available reports: {self.reports()}')
+        partitions = []
+        for entry in sorted(os.listdir(path)):
+            if entry == 'part.parquet':
+                partitions.append((None, os.path.join(path, entry)))
+            elif '=' in entry:
+                partitions.append((int(float(entry.split('=')[1])), os.path.join(path, entry, 'part.parquet')))
+        return partitions
+
+    def read(self, report, columns=None, years=None, where=None):
+        """Report restricted to years and to rows matching where ({column: value or list of values})"""
+        frames = []
+        for year, fname in self.partitions(report):
+            if years is not None and year is not None and year not in years:
+                continue
+            frames.append(pd.read_parquet(fname, columns=columns))
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+        for col, values in (where or {}).items():
+            if col not in df.columns:
+                continue
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            df = df.loc[df[col].isin(values)]
+        return df.reset_index(drop=True)
+
+    def query(self, reports, on=None, years=None, where=None, columns=None, rename=None, how='inner'):
+        """Reports joined on the columns on (by default all columns shared by the reports).
+        rename maps column names before joining (e.g. {'Year': 'year'}), columns selects columns per report
+        ({report: [columns]}); non key columns shared by several reports are suffixed with the report name."""
+        frames = []
+        for report in reports:
+            df = self.read(report, columns=(columns or {}).get(report), years=years, where=where)
+            frames.append(df.rename(columns=rename or {}))
+        if on is None:
+            on = [x for x in frames[0].columns if all(x in df.columns for df in frames[1:])]
+
+        merged = frames[0]
+        for report, df in zip(reports[1:], frames[1:]):
+            overlap = [x for x in df.columns if x in merged.columns and x not in on]
+            merged = pd.merge(left=merged, right=df.rename(columns={x: f'{x} {report}' for x in overlap}),
+                              on=on, how=how)
+        return merged
+
+    def write_simulations(self, simulations):
+        """Add or update the id, path and tags of analyzed simulations in the simulation table"""
+        rows = []
+        for sim in simulations:
+            tags = {k: (json.dumps(v) if isinstance(v, (list, dict)) else v) for k, v in sim.tags.items()}
+            rows.append(dict(sim_id=str(sim.id), **tags))
+        if len(rows) == 0:
+            return
+        df = pd.DataFrame(rows)
+        fname = os.path.join(self.path, 'simulations.parquet')
+        if os.path.exists(fname):
+            df = pd.concat([pd.read_parquet(fname), df], ignore_index=True).drop_duplicates('sim_id', keep='last')
+        os.makedirs(self.path, exist_ok=True)
+        df.to_parquet(fname + '.tmp', index=False)
+        os.replace(fname + '.tmp', fname)
+
+    def simulations(self, where=None):
+        df = pd.read_parquet(os.path.join(self.path, 'simulations.parquet'))
+        for col, values in (where or {}).items():
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            df = df.loc[df[col].isin(values)]
+        return df.reset_index(drop=True)
+
+
+def store_simulations(analyzer, simulations):
+    """Record the simulations analyzed by an analyzer created with store=True"""
+    if getattr(analyzer, 'store', False):
+        ExperimentStore(os.path.join(analyzer.working_dir, analyzer.expt_name)).write_simulations(simulations)
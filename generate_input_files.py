@@ -5,6 +5,7 @@ from dtk.tools.demographics.DemographicsGeneratorConcern import WorldBankBirthRa
     EquilibriumAgeDistributionConcern, DefaultIndividualAttributesConcern
 from dtk.tools.demographics.DemographicsGenerator import DemographicsGenerator
 from dtk.tools.climate.ClimateGenerator import ClimateGenerator
+from climate_files import climate_for_nodes
 
 
 def generate_demographics(demo_df, demo_fname):
@@ -43,6 +44,15 @@ def generate_climate(demo_fname):
     cg.generate_climate_files()
 
 
+def generate_climate_local(demo_fname, source_prefix, output_prefix, **kwargs):
+    """Climate files for all nodes of demo_fname derived locally from existing climate files of the site
+    (source_prefix_<variable>_daily.bin) without ClimateGenerator, kwargs as in climate_files.derive_climate"""
+    for variable in ['air_temperature', 'land_temperature', 'rainfall', 'relative_humidity']:
+        source_fname = f'{source_prefix}_{variable}_daily.bin'
+        if os.path.exists(source_fname):
+            climate_for_nodes(demo_fname, source_fname, f'{output_prefix}_{variable}_daily.bin', **kwargs)
+
+
 if __name__ == '__main__':
     inputs_path = os.path.join('./', 'input/Ghana')
     if not os.path.exists(inputs_path):
@@ -54,3 +64,6 @@ if __name__ == '__main__':
     demo_fname = os.path.join(inputs_path, 'Ghana_demographics.json')
     generate_demographics(df, demo_fname)
     generate_climate(demo_fname)
+    # or, without ClimateGenerator, from existing climate files of the site:
+    # generate_climate_local(demo_fname, source_prefix=os.path.join(inputs_path, 'Ghana_30arcsec'),
+    #                        output_prefix=os.path.join(inputs_path, 'Ghana'))
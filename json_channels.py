@@ -0,0 +1,107 @@
+import os
+import re
+import json
+import mmap
+import numpy as np
+
+"""
+Channel-selective reader for EMOD channel reports (InsetChart, ReportMalariaFiltered, ReportEventCounter).
+Instead of decoding the whole file into Python lists, only the 'Data' arrays of the requested channels are located in
+the raw file and converted directly into NumPy arrays. Works on a file path (memory-mapped) or on the raw file content,
+e.g. as returned by AnalyzeManager to analyzers created with parse=False.
+
+    from json_channels import read_channels
+    data = read_channels('output/InsetChart.json', ['Statistical Population', 'Daily EIR'])
+    data['Channels']['Daily EIR']['Data']
+"""
+
+
+def _block_end(buffer, start, opening=b'{', closing=b'}'):
+    """Index after the bracket closing the one at start (brackets inside strings are not expected in reports)"""
+    depth = 0
+    pattern = re.compile(re.escape(opening) + b'|' + re.escape(closing))
+    for match in pattern.finditer(buffer, start):
+        depth += 1 if match.group() == opening else -1
+        if depth == 0:
+            return match.end()
+    raise ValueError('Unbalanced brackets in report')
+
+
+def _channels_start(buffer):
+    match = re.compile(rb'"Channels"\s*:\s*\{').search(buffer)
+    if match is None:
+        raise KeyError('Channels')
+    return match.end() - 1
+
+
+def _parse_array(text):
+    if not text.strip():
+        return np.array([])
+    # decimals, exponents, NaN and (-)Infinity are parsed as float, channels of integers only as int64
+    if re.search(rb'[.ein]', text, re.IGNORECASE):
+        return np.fromstring(text, dtype=float, sep=',')
+    return np.fromstring(text, dtype=np.int64, sep=',')
+
+
+def channel_names(buffer):
+    """Names of all channels of a report, in file order"""
+    start = _channels_start(buffer)
+    end = _block_end(buffer, start)
+    names = []
+    pos = start + 1
+    key = re.compile(rb'"((?:[^"\\]|\\.)*)"\s*:\s*\{')
+    while True:
+        match = key.search(buffer, pos, end)
+        if match is None:
+            return names
+        names.append(json.loads(b'"' + match.group(1) + b'"'))
+        pos = _block_end(buffer, match.end() - 1)
+
+
+def read_channel(buffer, channel, start=None):
+    """Channel dictionary ('Data' as NumPy array, other keys such as 'Units' as in the json) of a report buffer"""
+    if start is None:
+        start = _channels_start(buffer)
+    # the key as written by json (escaped), without the quotes json.dumps adds around it
+    key = re.escape(json.dumps(channel)[1:-1].encode())
+    match = re.compile(b'"' + key + rb'"\s*:\s*\{').search(buffer, start)
+    if match is None:
+        raise KeyError(channel)
+    channel_start = match.end() - 1
+    channel_end = _block_end(buffer, channel_start)
+    data = re.compile(rb'"Data"\s*:\s*\[').search(buffer, channel_start, channel_end)
+    data_end = buffer.find(b']', data.end(), channel_end)
+
+    content = {'Data': _parse_array(buffer[data.end():data_end])}
+    # remaining (small) keys of the channel, e.g. Units
+    rest = buffer[channel_start:data.start()] + buffer[data_end + 1:channel_end]
+    rest = re.sub(rb',\s*,', b',', re.sub(rb'\{\s*,', b'{', re.sub(rb',\s*\}', b'}', rest)))
+    content.update(json.loads(rest))
+    return content
+
+
+def read_header(buffer):
+    match = re.compile(rb'"Header"\s*:\s*\{').search(buffer)
+    if match is None:
+        return {}
+    return json.loads(buffer[match.end() - 1:_block_end(buffer, match.end() - 1)])
+
+
+def read_channels(source, channels=None):
+    """Header and selected channels (all if None) of a report file path or raw file content, in the structure of
+    the parsed json ({'Header': ..., 'Channels': {channel: {'Data': array, ...}}})"""
+    if isinstance(source, (bytes, bytearray, mmap.mmap)):
+        return _read_channels(source, channels)
+    with open(source, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f'Empty report {source}')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return _read_channels(buffer, channels)
+
+
+def _read_channels(buffer, channels):
+    start = _channels_start(buffer)
+    if channels is None:
+        channels = channel_names(buffer)
+    return {'Header': read_header(buffer),
+            'Channels': {channel: read_channel(buffer, channel, start) for channel in channels}}
@@ -1,5 +1,6 @@
 import os
 import json
+from json_channels import read_channels
 
 user = os.getlogin()  # user initials
 expt_name = f'{user}_FE_2022_example_w3a'  ## change expt_name
@@ -37,3 +38,7 @@ data['Channels'][selected_channel]['Data'][:10]  # show only first 10 values
 data['Channels'][selected_channel]['Data'][-10:] # show only last 10 values
 
 
+## -> For large reports, load only selected channels as numpy arrays (much faster than json.load)
+fpath = os.path.join(exp_path, sim_name, 'output', fname)
+data = read_channels(fpath, channels=[selected_channel])
+data['Channels'][selected_channel]['Data'][:10]
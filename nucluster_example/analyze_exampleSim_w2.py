@@ -18,6 +18,7 @@ from nucluster_helper import *
 
 sys.path.append('../')
 from analyzer_collection import InsetChartAnalyzer, AnnualAgebinPfPRAnalyzer
+from parallel_analyze import run_analyzers
 
 # This block will be used unless overridden on the command-line
 if os.name == "posix":
@@ -46,8 +47,11 @@ if __name__ == "__main__":
                                           end_year=2025)
                  ]
 
-    am = AnalyzeManager(expt_id, analyzers=analyzers)
-    am.analyze()
+    if args.cpus is not None:
+        run_analyzers(expt_id, analyzers, cpus=args.cpus)
+    else:
+        am = AnalyzeManager(expt_id, analyzers=analyzers)
+        am.analyze()
 
     # read in analyzed InsetChart data
     df = pd.read_csv(os.path.join(working_dir, expt_name, 'All_Age_InsetChart.csv'))
@@ -21,11 +21,18 @@ def parse_args():
         type=str,
         help="Unique ID of simulation experiment"
     )
+    parser.add_argument(
+        "-c",
+        "--cpus",
+        type=int,
+        help="Number of processes used to run the analyzers (default AnalyzeManager)",
+        default=None
+    )
     return parser.parse_args()
 
 
 def shell_header(A='b1139', p='b1139', t='02:00:00', N=1, ntasks_per_node=1, memG=8, job_name='slurmjob',
-                 arrayJob=None):
+                 arrayJob=None, cpus_per_task=None):
     """Requires a 'log' subfolder to write in .err and .out files, alternatively log/ needs to be removed"""
     header = f'#!/bin/bash\n' \
              f'#SBATCH -A {A}\n' \
@@ -35,6 +42,8 @@ def shell_header(A='b1139', p='b1139', t='02:00:00', N=1, ntasks_per_node=1, mem
              f'#SBATCH --ntasks-per-node={ntasks_per_node}\n' \
              f'#SBATCH --mem={memG}G\n' \
              f'#SBATCH --job-name="{job_name}"\n'
+    if cpus_per_task is not None:
+        header = header + f'#SBATCH --cpus-per-task={cpus_per_task}\n'
     if arrayJob is not None:
         array = arrayJob
         err = '#SBATCH --error=log/slurm_%A_%a.err\n'
@@ -48,11 +57,13 @@ def shell_header(A='b1139', p='b1139', t='02:00:00', N=1, ntasks_per_node=1, mem
 
 
 def create_analyzer_submission_script(expt_name, expt_id, WDIR=os.getcwd(), A='b1139', p='b1139', t='04:00:00',
-                                      analyzer_script="analyze_exampleSim_w2.py"):
+                                      analyzer_script="analyze_exampleSim_w2.py", memG=80, cpus=1):
+    """With cpus > 1 the analyzers run in cpus processes on the node (parallel_analyze.run_analyzers)"""
     analyzer_script_name = f'run_analyzer_{expt_id}.sh'
     job_name = f'analyze_{expt_id}'
     header = f'#!/bin/bash\n#SBATCH -A {A}\n#SBATCH -p {p}\n#SBATCH -t {t}\n#SBATCH -N 1\n' \
-             f'#SBATCH --ntasks-per-node=1\n#SBATCH --mem=80G\n#SBATCH --job-name="{expt_id}"\n'
+             f'#SBATCH --ntasks-per-node=1\n#SBATCH --cpus-per-task={cpus}\n#SBATCH --mem={memG}G\n' \
+             f'#SBATCH --job-name="{expt_id}"\n'
     err = '#SBATCH --error=log/slurm_%A_%a.err\n'
     out = '#SBATCH --output=log/slurm_%A_%a.out\n'
     header_post = header + err + out
@@ -65,6 +76,8 @@ def create_analyzer_submission_script(expt_name, expt_id, WDIR=os.getcwd(), A='b
 
     pycommand2 = f'\ncd /projects/b1139/faculty-enrich_IO/faculty-enrich-2022-examples/nucluster_example' \
                  f'\npython {analyzer_script} --expt_name {expt_name} --expt_id {expt_id}'
+    if cpus > 1:
+        pycommand2 = pycommand2 + f' --cpus {cpus}'
     file = open(os.path.join(WDIR, analyzer_script_name), 'w')
     file.write(header_post + pymodule + pycommand1 + pycommand2)
     file.close()
@@ -0,0 +1,79 @@
+import os
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from json_channels import read_channel
+
+"""
+Parsed-output cache shared by the analyzers of one AnalyzeManager run.
+AnalyzeManager passes the same parsed files of a simulation to every analyzer, but each analyzer used to turn the
+'Channels' lists into its own DataFrame. The cache keeps every channel as a NumPy array keyed by
+(simulation id, file, file mtime, channel), so a channel is materialized once per simulation no matter how many
+analyzers use it. Only the arrays of the simulation being analyzed are kept: the cache is cleared when the next
+simulation is requested, and entries are evicted least-recently-used if one simulation exceeds max_bytes.
+Analyzers created with parse=False receive the raw file content, from which only the requested channels are read.
+"""
+
+
+class OutputCache:
+
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._arrays = OrderedDict()
+        self._mtimes = {}
+        self._simulation = None
+
+    def _use_simulation(self, simulation):
+        # arrays of a finished simulation are never read again
+        if self._simulation != simulation.id:
+            self.clear()
+            self._simulation = simulation.id
+
+    def file_mtime(self, simulation, filename):
+        """mtime of an output file, read once per simulation and file"""
+        self._use_simulation(simulation)
+        if filename not in self._mtimes:
+            try:
+                self._mtimes[filename] = os.path.getmtime(os.path.join(simulation.get_path(), filename))
+            except Exception:  # outputs not on a local or mounted file system (e.g. COMPS)
+                self._mtimes[filename] = None
+        return self._mtimes[filename]
+
+    def channel(self, data, simulation, filename, channel):
+        """Channel 'Data' of a parsed report as read-only array, converted once per simulation and file.
+        The returned array is shared with other analyzers."""
+        key = (simulation.id, filename, self.file_mtime(simulation, filename), channel)
+        if key in self._arrays:
+            self.hits += 1
+            self._arrays.move_to_end(key)
+            return self._arrays[key]
+
+        self.misses += 1
+        if isinstance(data[filename], (bytes, bytearray)):  # raw file content of analyzers with parse=False
+            arr = read_channel(data[filename], channel)['Data']
+        else:
+            arr = np.array(data[filename]['Channels'][channel]['Data'])
+        arr.flags.writeable = False
+        self._arrays[key] = arr
+        self.nbytes += arr.nbytes
+        while self.nbytes > self.max_bytes and len(self._arrays) > 1:
+            _, evicted = self._arrays.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+        return arr
+
+    def channel_frame(self, data, simulation, filename, channels):
+        """DataFrame with one column per channel, sharing the cached (read-only) arrays.
+        Columns can be added or replaced, in place changes of the channel columns raise an error."""
+        return pd.DataFrame({x: self.channel(data, simulation, filename, x) for x in channels}, copy=False)
+
+    def clear(self):
+        self._arrays.clear()
+        self._mtimes = {}
+        self._simulation = None
+        self.nbytes = 0
+
+
+output_cache = OutputCache()
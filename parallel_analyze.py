@@ -0,0 +1,172 @@
+import os
+import json
+import traceback
+import multiprocessing
+import numpy as np
+import pandas as pd
+from experiment_store import store_simulations
+
+"""
+Local multi-process alternative to AnalyzeManager for experiments with outputs on a local or mounted file system
+(LOCAL or NUCLUSTER), e.g. to use all cores of the node running the analyzer job on Quest.
+Simulations are distributed over a pool of worker processes. Each worker reads the output files of a simulation once,
+runs select_simulation_data of every analyzer that does not filter the simulation out, and sends the results back as
+plain NumPy arrays (one per column) instead of pickled DataFrames. finalize runs in the main process as usual, and
+analyzers with a reduce() hook (e.g. TransmissionReport) fold each result into running aggregates as it arrives.
+Errors of select_simulation_data are collected per simulation and reported once all simulations are analyzed;
+run_analyzers then raises (or, with fail_on_error=False, finalizes the analyzers without the failed results).
+
+    from parallel_analyze import run_analyzers
+    run_analyzers(expt_id, analyzers, cpus=16)
+"""
+
+_worker_analyzers = None
+
+
+class SimulationInfo:
+    """Picklable stand-in for a simtools Simulation, with the attributes used by the analyzers"""
+
+    def __init__(self, id, tags, path):
+        self.id = id
+        self.tags = tags
+        self.path = path
+
+    def get_path(self):
+        return self.path
+
+    def __repr__(self):
+        return f'Simulation {self.id}'
+
+
+def experiment_simulations(expt_id):
+    from simtools.Utilities.Experiments import retrieve_experiment
+    experiment = retrieve_experiment(expt_id)
+    return [SimulationInfo(sim.id, dict(sim.tags), sim.get_path()) for sim in experiment.simulations]
+
+
+def default_cpus():
+    """Cores allocated by slurm (--cpus-per-task) or all cores of the machine"""
+    return int(os.environ.get('SLURM_CPUS_PER_TASK', os.cpu_count()))
+
+
+def read_output(path, parse=True):
+    """Parsed output file as passed by AnalyzeManager (raw bytes for analyzers with parse=False)"""
+    if parse and path.endswith('.json'):
+        with open(path) as f:
+            return json.load(f)
+    if parse and path.endswith('.csv'):
+        return pd.read_csv(path)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def pack_result(result):
+    """Results of select_simulation_data as dicts of NumPy arrays (DataFrames column by column)"""
+    if isinstance(result, dict):
+        return {'dict': {key: pack_result(value) for key, value in result.items()}}
+    if isinstance(result, pd.DataFrame):
+        columns = {}
+        for col in result.columns:
+            if isinstance(result[col].dtype, pd.CategoricalDtype):
+                columns[col] = ('category', result[col].cat.codes.values, np.asarray(result[col].cat.categories))
+            else:
+                columns[col] = ('array', result[col].values)
+        return {'frame': columns}
+    return {'object': result}
+
+
+def unpack_result(packed):
+    if 'dict' in packed:
+        return {key: unpack_result(value) for key, value in packed['dict'].items()}
+    if 'frame' in packed:
+        columns = {}
+        for col, value in packed['frame'].items():
+            if value[0] == 'category':
+                columns[col] = pd.Categorical.from_codes(value[1], categories=value[2])
+            else:
+                columns[col] = value[1]
+        return pd.DataFrame(columns)
+    return packed['object']
+
+
+def _init_worker(analyzers):
+    global _worker_analyzers
+    _worker_analyzers = analyzers
+
+
+def analyze_simulation(simulation, analyzers=None):
+    """select_simulation_data of every analyzer for one simulation, reading each output file once.
+    Returns the simulation, the packed results and the failures (analyzer, traceback) of the simulation"""
+    analyzers = analyzers or _worker_analyzers
+    outputs = {}
+    results = {}
+    failures = []
+    for i, analyzer in enumerate(analyzers):
+        if not analyzer.filter(simulation):
+            continue
+        parse = getattr(analyzer, 'parse', True)
+        for fname in analyzer.filenames:
+            if (fname, parse) not in outputs:
+                outputs[(fname, parse)] = read_output(os.path.join(simulation.get_path(), fname), parse)
+        data = {fname: outputs[(fname, parse)] for fname in analyzer.filenames}
+        try:
+            results[i] = pack_result(analyzer.select_simulation_data(data, simulation))
+        except Exception:
+            failures.append((type(analyzer).__name__, traceback.format_exc()))
+    return simulation, results, failures
+
+
+def run_analyzers(expt_id, analyzers, cpus=None, simulations=None, fail_on_error=True):
+    """Run analyzers on all simulations of experiment expt_id (or on the given simulations) with cpus processes.
+    Raises a RuntimeError if an analyzer failed for any simulation, unless fail_on_error=False"""
+    if simulations is None:
+        simulations = experiment_simulations(expt_id)
+    cpus = cpus or default_cpus()
+    for analyzer in analyzers:
+        analyzer.initialize()
+
+    print(f'Analyzing {len(simulations)} simulations with {cpus} processes')
+    if cpus == 1:
+        return collect_results(analyzers, (analyze_simulation(sim, analyzers) for sim in simulations), fail_on_error)
+    with multiprocessing.Pool(cpus, initializer=_init_worker, initargs=(analyzers,)) as pool:
+        chunksize = max(1, len(simulations) // (cpus * 4))
+        return collect_results(analyzers, pool.imap(analyze_simulation, simulations, chunksize=chunksize),
+                               fail_on_error)
+
+
+def collect_results(analyzers, sim_results, fail_on_error=True):
+    """Finalize analyzers from the results of analyze_simulation (in simulation order).
+    Results of analyzers with a reduce() hook are folded into their running aggregates as they arrive and are not
+    kept, the other analyzers receive the results of all simulations in finalize."""
+    all_data = [{} for _ in analyzers]
+    aggregates = [None for _ in analyzers]
+    reduced = [[] for _ in analyzers]
+    failures = []
+    for simulation, results, sim_failures in sim_results:
+        failures += [(name, simulation.id, error) for name, error in sim_failures]
+        for i, packed in results.items():
+            if hasattr(analyzers[i], 'reduce'):
+                aggregates[i] = analyzers[i].reduce(aggregates[i], unpack_result(packed))
+                reduced[i].append(simulation)
+            else:
+                all_data[i][simulation] = unpack_result(packed)
+
+    if failures:
+        for name, sim_id, error in failures:
+            print(f'\n{name} failed for simulation {sim_id}:\n{error}')
+        summary = f'{len(failures)} analyzer failures in {len(set(x[1] for x in failures))} simulations'
+        if fail_on_error:
+            raise RuntimeError(summary)
+        print(f'\nWarning: {summary}, finalizing without their results')
+
+    outputs = []
+    for i, analyzer in enumerate(analyzers):
+        if not hasattr(analyzer, 'reduce'):
+            outputs.append(analyzer.finalize(all_data[i]))
+        elif aggregates[i] is None:
+            print(f"\nWarning: No data have been returned for {type(analyzer).__name__}... Exiting...")
+            outputs.append(None)
+        else:
+            store_simulations(analyzer, reduced[i])
+            outputs.append(analyzer.finalize_aggregate(aggregates[i]))
+    return outputs
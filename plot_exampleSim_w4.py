@@ -1,5 +1,4 @@
 import os
-import datetime
 import pandas as pd
 import numpy as np
 
@@ -7,6 +6,8 @@ import matplotlib.pyplot as plt
 import matplotlib as mpl
 import matplotlib.dates as mdates
 import seaborn as sns
+from sim_calendar import month_start_date
+from table_io import read_table
 
 mpl.rcParams['pdf.fonttype'] = 42
 palette = sns.color_palette("tab10")
@@ -14,8 +15,7 @@ palette = sns.color_palette("tab10")
 
 def plot_inset_chart(channels_inset_chart, sweep_variables):
     # read in analyzed InsetChart data
-    df = pd.read_csv(os.path.join(working_dir, expt_name, 'All_Age_InsetChart.csv'))
-    df['date'] = pd.to_datetime(df['date'])
+    df = read_table(os.path.join(working_dir, expt_name, 'All_Age_InsetChart.csv'))
 
     ## Aggregate runs
     df = df.groupby(['date'] + sweep_variables)[channels_inset_chart].agg(np.mean).reset_index()
@@ -44,8 +44,8 @@ def plot_inset_chart(channels_inset_chart, sweep_variables):
 
 
 def plot_summary_report(sweep_variables, channels_summary_report=None, Uage='U5'):
-    df = pd.read_csv(os.path.join(sim_dir, f'{Uage}_PfPR_ClinicalIncidence.csv'))
-    df['date'] = df.apply(lambda x: datetime.date(int(x['year']), int(x['month']), 1), axis=1)
+    df = read_table(os.path.join(sim_dir, f'{Uage}_PfPR_ClinicalIncidence.csv'))
+    df['date'] = month_start_date(df['year'], df['month'])
     df.columns = [x.replace(f' {Uage}', '') for x in df.columns]
 
     if channels_summary_report is None:
@@ -83,7 +83,7 @@ def plot_agebin_summary_report(sweep_variables, channels_summary_report=None):
     # read in analyzed summary reporrt
     if channels_summary_report is None:
         channels_summary_report = ['Pop', 'Cases', 'Severe cases', 'PfPR']
-    df = pd.read_csv(os.path.join(working_dir, expt_name, 'Agebin_PfPR_ClinicalIncidence_annual.csv'))
+    df = read_table(os.path.join(working_dir, expt_name, 'Agebin_PfPR_ClinicalIncidence_annual.csv'))
     df = df.sort_values(by='agebin')
     # take mean over all years in report
     df = df.groupby(['agebin'] + sweep_variables)[channels_summary_report].agg(np.mean).reset_index()
@@ -110,8 +110,7 @@ def plot_agebin_summary_report(sweep_variables, channels_summary_report=None):
 
 def plot_events(event_list, sweep_variables):
     # read in analyzed event data
-    df = pd.read_csv(os.path.join(working_dir, expt_name, 'Event_Count.csv'))
-    df['date'] = pd.to_datetime(df['date'])
+    df = read_table(os.path.join(working_dir, expt_name, 'Event_Count.csv'))
     cov_channel_list = [f'{x[9:]}_Coverage' for x in event_list]
     cov_channel_list = [x for x in cov_channel_list if x in df.columns.values]
     df = df.groupby(['date'] + sweep_variables)[event_list + cov_channel_list].agg(np.mean).reset_index()
@@ -151,7 +150,7 @@ def plot_transmission(sweep_variables, time_res='Monthly', selected_year=None):
     else:
         selected_year = '_all_years'
 
-    df = pd.read_csv(os.path.join(sim_dir, f'{time_res}_transmission_report{selected_year}.csv'))
+    df = read_table(os.path.join(sim_dir, f'{time_res}_transmission_report{selected_year}.csv'))
     x_var = 'Year'
     if 'date' in df.columns:
         df['date'] = pd.to_datetime(df['date'])
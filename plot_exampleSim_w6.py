@@ -7,6 +7,7 @@ import matplotlib.pyplot as plt
 import matplotlib as mpl
 import matplotlib.dates as mdates
 import seaborn as sns
+from table_io import read_table
 
 mpl.rcParams['pdf.fonttype'] = 42
 palette = sns.color_palette("tab10")
@@ -15,12 +16,10 @@ palette = sns.color_palette("tab10")
 def plot_inset_chart(expt_name_burnin, expt_name_pickup, channels_inset_chart, sweep_variables, serialize_years):
     # read in analyzed InsetChart data
 
-    df_burnin = pd.read_csv(os.path.join(working_dir, expt_name_burnin, 'All_Age_InsetChart.csv'))
-    df_burnin['date'] = pd.to_datetime(df_burnin['date'])
+    df_burnin = read_table(os.path.join(working_dir, expt_name_burnin, 'All_Age_InsetChart.csv'))
     df_burnin = df_burnin.groupby(['date'])[channels_inset_chart].agg(np.mean).reset_index()
 
-    df_pickup = pd.read_csv(os.path.join(working_dir, expt_name_pickup, 'All_Age_InsetChart.csv'))
-    df_pickup['date'] = pd.to_datetime(df_pickup['date'])
+    df_pickup = read_table(os.path.join(working_dir, expt_name_pickup, 'All_Age_InsetChart.csv'))
     df_pickup = df_pickup.groupby(['date'] + sweep_variables)[channels_inset_chart].agg(np.mean).reset_index()
 
     # make InsetChart plot
@@ -50,13 +49,11 @@ def plot_inset_chart(expt_name_burnin, expt_name_pickup, channels_inset_chart, s
 def plot_inset_chart_annual(expt_name_burnin, expt_name_pickup, channels_inset_chart, sweep_variables, serialize_years):
     # read in analyzed InsetChart data
 
-    df_burnin = pd.read_csv(os.path.join(working_dir, expt_name_burnin, 'All_Age_InsetChart.csv'))
-    df_burnin['date'] = pd.to_datetime(df_burnin['date'])
+    df_burnin = read_table(os.path.join(working_dir, expt_name_burnin, 'All_Age_InsetChart.csv'))
     df_burnin['year'] = df_burnin['date'].dt.year
     df_burnin = df_burnin.groupby(['year'])[channels_inset_chart].agg(np.mean).reset_index()
 
-    df_pickup = pd.read_csv(os.path.join(working_dir, expt_name_pickup, 'All_Age_InsetChart.csv'))
-    df_pickup['date'] = pd.to_datetime(df_pickup['date'])
+    df_pickup = read_table(os.path.join(working_dir, expt_name_pickup, 'All_Age_InsetChart.csv'))
     df_pickup['year'] = df_pickup['date'].dt.year
     df_pickup = df_pickup.groupby(['year'] + sweep_variables)[channels_inset_chart].agg(np.mean).reset_index()
 
@@ -0,0 +1,137 @@
+import os
+import json
+import hashlib
+import pandas as pd
+from simtools.Analysis.BaseAnalyzers import BaseAnalyzer
+from output_cache import output_cache
+from parallel_analyze import SimulationInfo
+
+"""
+Persistent cache of per-simulation analyzer results for incremental re-analysis.
+Wrap any analyzer from analyzer_collection.py in CachedAnalyzer to store the output of select_simulation_data for each
+simulation under cache_dir/<expt_id>/<analyzer class>_<parameter hash>/<sim id>. Simulations with a valid entry are
+filtered out, so AnalyzeManager neither retrieves nor parses their outputs, and their results are read back from the
+cache before finalize, keyed like fresh results by a simulation (SimulationInfo with the id, tags and path stored next
+to the entry). Re-running an analysis after changing only finalize or plotting code therefore only reads the cache.
+Entries are stored as Parquet (if pyarrow is installed) and as pickle otherwise.
+"""
+
+# attributes that do not change the output of select_simulation_data
+IGNORED_PARAMETERS = ['working_dir', 'expt_name', 'results', 'burnin', 'agebin_max', 'output_fname', 'output_format',
+                      'store']
+
+
+def parameter_hash(analyzer):
+    params = {k: v for k, v in sorted(vars(analyzer).items()) if k not in IGNORED_PARAMETERS}
+    params = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.md5(params.encode()).hexdigest()[:10]
+
+
+def save_result(result, path):
+    """Write one simulation result to path (without extension), dicts of results as a folder"""
+    if isinstance(result, dict):
+        os.makedirs(path, exist_ok=True)
+        keys = list(result.keys())
+        for i, key in enumerate(keys):
+            save_result(result[key], os.path.join(path, str(i)))
+        # the key file is written last and marks the entry as complete
+        with open(os.path.join(path, 'keys.json'), 'w') as f:
+            json.dump(keys, f)
+        return
+
+    if isinstance(result, pd.DataFrame):
+        try:
+            result.reset_index(drop=True).to_parquet(path + '.parquet.tmp', index=False)
+            os.replace(path + '.parquet.tmp', path + '.parquet')
+            return
+        except Exception:  # pyarrow not installed or column types not supported by parquet
+            if os.path.exists(path + '.parquet.tmp'):
+                os.remove(path + '.parquet.tmp')
+    pd.to_pickle(result, path + '.pkl.tmp')
+    os.replace(path + '.pkl.tmp', path + '.pkl')
+
+
+def result_file(path):
+    """Completed cache entry at path or None"""
+    for fname in [os.path.join(path, 'keys.json'), path + '.parquet', path + '.pkl']:
+        if os.path.exists(fname):
+            return fname
+    return None
+
+
+def save_simulation(simulation, path):
+    with open(path + '.sim.json.tmp', 'w') as f:
+        json.dump({'id': str(simulation.id), 'tags': dict(simulation.tags), 'path': simulation.get_path()}, f,
+                  default=str)
+    os.replace(path + '.sim.json.tmp', path + '.sim.json')
+
+
+def load_simulation(path):
+    with open(path + '.sim.json') as f:
+        return SimulationInfo(**json.load(f))
+
+
+def load_result(path):
+    fname = result_file(path)
+    if fname.endswith('keys.json'):
+        with open(fname) as f:
+            keys = json.load(f)
+        return {key: load_result(os.path.join(path, str(i))) for i, key in enumerate(keys)}
+    if fname.endswith('.parquet'):
+        return pd.read_parquet(fname)
+    return pd.read_pickle(fname)
+
+
+class CachedAnalyzer(BaseAnalyzer):
+
+    def __init__(self, analyzer, expt_id, cache_dir=os.path.join('simulation_outputs', '.analyzer_cache')):
+        super(CachedAnalyzer, self).__init__(working_dir=analyzer.working_dir, filenames=analyzer.filenames,
+                                             parse=getattr(analyzer, 'parse', True))
+        self.analyzer = analyzer
+        self.expt_id = expt_id
+        self.cache_path = os.path.join(cache_dir, str(expt_id),
+                                       f'{type(analyzer).__name__}_{parameter_hash(analyzer)}')
+        if not os.path.exists(self.cache_path):
+            os.makedirs(self.cache_path)
+
+    def entry_valid(self, simulation):
+        path = os.path.join(self.cache_path, str(simulation.id))
+        fname = result_file(path)
+        if fname is None or not os.path.exists(path + '.sim.json'):
+            return False
+        # outputs written after the entry (e.g. a re-run simulation) invalidate it
+        mtimes = [output_cache.file_mtime(simulation, f) for f in self.filenames]
+        return all(m is None or m <= os.path.getmtime(fname) for m in mtimes)
+
+    def initialize(self):
+        self.analyzer.initialize()
+
+    def filter(self, simulation):
+        if not self.analyzer.filter(simulation):
+            return False
+        return not self.entry_valid(simulation)
+
+    def select_simulation_data(self, data, simulation):
+        simdata = self.analyzer.select_simulation_data(data, simulation)
+        if isinstance(simdata, str):
+            # file written by the analyzer (streamed IndividualEvents part), removed by its finalize
+            return simdata
+        save_simulation(simulation, os.path.join(self.cache_path, str(simulation.id)))
+        save_result(simdata, os.path.join(self.cache_path, str(simulation.id)))
+        return simdata
+
+    def finalize(self, all_data):
+        analyzed = [str(sim.id) for sim in all_data.keys()]
+        cached = {}
+        for entry in sorted(os.listdir(self.cache_path)):
+            sim_id = entry.split('.')[0]
+            path = os.path.join(self.cache_path, sim_id)
+            if sim_id in analyzed or sim_id in cached:
+                continue
+            if result_file(path) is not None and os.path.exists(path + '.sim.json'):
+                cached[sim_id] = (load_simulation(path), load_result(path))
+        print(f'\n{type(self.analyzer).__name__}: {len(analyzed)} simulations analyzed, {len(cached)} read from cache')
+
+        all_data = dict(all_data)
+        all_data.update(cached.values())
+        return self.analyzer.finalize(all_data)
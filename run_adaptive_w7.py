@@ -0,0 +1,76 @@
+import os
+
+import pandas as pd
+from dtk.utils.core.DTKConfigBuilder import DTKConfigBuilder
+from simtools.Analysis.AnalyzeManager import AnalyzeManager
+from simtools.ExperimentManager.ExperimentManagerFactory import ExperimentManagerFactory
+from simtools.ModBuilder import ModFn
+
+from adaptive_sampling import initial_round, propose_round, make_builder, value_summary
+from analyzer_collection import MonthlyPfPRAnalyzerU5
+from run_examplePickup_w7 import cb, burnin_index, itn_intervention, user
+from select_w7 import load_sim_pfpr, score_runs
+
+"""
+Adaptive version of the week 7 pick-up sweep: instead of running all itn_coverage values of a fixed grid with the
+same number of seeds, rounds of pick-up simulations are run, analyzed and scored against the DHS data, and the next
+round refines the itn_coverage values around the best fit and adds seeds to close contenders (adaptive_sampling.py).
+Pick-ups with Run_Number beyond the burn-in seeds start from burn-in seed Run_Number % number of burn-in seeds.
+"""
+
+expt_name = f'{user}_FE_2022_example_w7_adaptive'
+working_dir = os.path.join('simulation_outputs')
+data_dir = os.path.join('data')
+variable = 'itn_coverage'
+sweep_variables = [variable, 'Run_Number']
+max_rounds = 4
+
+burnin_seeds = sorted(int(x['Run_Number']) for x in burnin_index.keys())
+
+
+def pickup_mods(itn_cov, seed):
+    burnin_seed = burnin_seeds[seed % len(burnin_seeds)]
+    return [ModFn(itn_intervention, itn_cov),
+            ModFn(DTKConfigBuilder.set_param, 'Serialized_Population_Path', burnin_index.path(Run_Number=burnin_seed)),
+            ModFn(DTKConfigBuilder.set_param, 'Run_Number', seed)]
+
+
+def run_round(runs, round_name):
+    exp_manager = ExperimentManagerFactory.init()
+    exp_manager.run_simulations(exp_name=round_name, config_builder=cb,
+                                exp_builder=make_builder(runs, variable, pickup_mods))
+    exp_manager.wait_for_finished(verbose=True)
+    assert (exp_manager.succeeded())
+
+    analyzer = MonthlyPfPRAnalyzerU5(expt_name=round_name,
+                                     working_dir=working_dir,
+                                     start_year=2010,
+                                     end_year=2012,
+                                     sweep_variables=sweep_variables)
+    am = AnalyzeManager(exp_manager.experiment.exp_id, analyzers=[analyzer])
+    am.analyze()
+    return load_sim_pfpr(os.path.join(working_dir, round_name, 'U5_PfPR_ClinicalIncidence.csv'))
+
+
+if __name__ == "__main__":
+    dhs_pfpr_df = pd.read_csv(os.path.join(data_dir, 'w7_fake_DHS.csv'))
+    runs = initial_round([0.2, 0.35, 0.5], seeds=3, variable=variable)
+
+    run_scores = []
+    for i in range(max_rounds):
+        print(f'Round {i}: {len(runs)} simulations')
+        sim_df = run_round(runs, f'{expt_name}_round{i}')
+        round_scores = score_runs(sim_df, dhs_pfpr_df, sweep_variables)
+        round_scores['round'] = i
+        run_scores.append(round_scores)
+
+        runs = propose_round(pd.concat(run_scores, ignore_index=True), variable, bounds=(0, 1), resolution=0.01)
+        if len(runs) == 0:
+            break
+
+    run_scores = pd.concat(run_scores, ignore_index=True)
+    summary = value_summary(run_scores, variable)
+    print(summary)
+    os.makedirs(os.path.join(working_dir, expt_name), exist_ok=True)
+    run_scores.to_csv(os.path.join(working_dir, expt_name, 'run_scores.csv'), index=False)
+    summary.to_csv(os.path.join(working_dir, expt_name, 'scores.csv'), index=False)
@@ -1,6 +1,5 @@
 import os
 
-import pandas as pd
 from dtk.interventions.itn import add_ITN
 from dtk.utils.core.DTKConfigBuilder import DTKConfigBuilder
 from dtk.vector.species import set_species, set_larval_habitat
@@ -11,20 +10,27 @@ from simtools.SetupParser import SetupParser
 from simtools.ModBuilder import ModBuilder, ModFn
 
 # This block will be used unless overridden on the command-line
-from simtools.Utilities.Experiments import retrieve_experiment
+from burnin_index import BurninIndex, state_filename
+from serialized_states import StateCatalog
 
 SetupParser.default_block = 'HPC'
 burnin_id = "ebfd2b10-0cd6-ec11-a9f8-b88303911bc1"  # UPDATE with burn-in experiment id
 pull_year = 20  # year of burn-in to pick-up from
 pickup_years = 2  # years of pick-up to run
 numseeds = 5
+# True: if a burn-in simulation has no state at the end of pull_year, pick up from the nearest year end saved by all
+# of them instead of failing
+use_nearest_state = False
 
 SetupParser.init()
 cb = DTKConfigBuilder.from_defaults('MALARIA_SIM')
-expt = retrieve_experiment(burnin_id)  # Identifies the desired burn-in experiment
-# Loop through unique "tags" to distinguish between burn-in scenarios (ex. varied historical coverage levels)
-ser_df = pd.DataFrame([x.tags for x in expt.simulations])
-ser_df["outpath"] = pd.Series([sim.get_path() for sim in expt.simulations])
+# Index the burn-in simulations by their "tags" to distinguish between burn-in scenarios (ex. varied historical
+# coverage levels), and check that all of them saved their state in pull_year
+burnin_index = BurninIndex(burnin_id, key_tags=['Run_Number'])
+if use_nearest_state:
+    pull_year = StateCatalog(burnin_index, checksum=False).nearest_day(pull_year * 365, step=365) // 365
+else:
+    burnin_index.validate(pull_year)
 
 cb.update_params({
     'Demographics_Filenames': [os.path.join('Namawala', 'Namawala_single_node_demographics.json')],
@@ -34,7 +40,7 @@ cb.update_params({
     "Relative_Humidity_Filename": os.path.join('Namawala', 'Namawala_single_node_relative_humidity_daily.bin'),
     'Simulation_Duration': pickup_years * 365,
     'Serialized_Population_Reading_Type': 'READ',
-    'Serialized_Population_Filenames': ['state-%05d.dtk' % (pull_year * 365)],
+    'Serialized_Population_Filenames': [state_filename(pull_year)],
     'Enable_Random_Generator_From_Serialized_Population': 0,
     'Serialization_Mask_Node_Read': 0,
     'Enable_Default_Reporting': 1
@@ -88,7 +94,7 @@ builder = ModBuilder.from_list(
     [[ModFn(itn_intervention, itn_cov),
       ModFn(DTKConfigBuilder.set_param,
             'Serialized_Population_Path',
-            os.path.join(ser_df[ser_df.Run_Number == seed].outpath.iloc[0], 'output')),
+            burnin_index.path(Run_Number=seed)),
       ModFn(DTKConfigBuilder.set_param, 'Run_Number', seed)]
      # Run pick-up from each unique burn-in scenario
      for itn_cov in [0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5]
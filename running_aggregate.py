@@ -0,0 +1,53 @@
+import pandas as pd
+
+"""
+Running per-group aggregates for analyzers that reduce simulation results as they arrive (reduce() hook in
+analyzer_collection.py) instead of concatenating the results of all simulations in finalize.
+Only sums, sums of squares and counts per group key are kept, so memory is proportional to the number of output
+groups and means and variances are computed at the end.
+Memory is only bounded when the results are reduced as they arrive, i.e. with parallel_analyze.run_analyzers:
+AnalyzeManager still passes the results of all simulations to finalize, which then reduces them one by one.
+"""
+
+
+class RunningAggregate:
+
+    def __init__(self, keys, columns):
+        self.keys = keys
+        self.columns = columns
+        self.sums = None
+        self.sumsq = None
+        self.counts = None
+
+    def add(self, df):
+        """Fold the rows of df into the running sums, sums of squares and counts"""
+        # categorical keys of different simulations have different categories, group on the values
+        keys = [df[k].astype(object) if isinstance(df[k].dtype, pd.CategoricalDtype) else df[k] for k in self.keys]
+        values = df[self.columns]
+        sums = values.groupby(keys).sum()
+        sumsq = (values ** 2).groupby(keys).sum()
+        counts = values.groupby(keys).count()
+        if self.sums is None:
+            self.sums, self.sumsq, self.counts = sums, sumsq, counts
+        else:
+            self.sums = self.sums.add(sums, fill_value=0)
+            self.sumsq = self.sumsq.add(sumsq, fill_value=0)
+            self.counts = self.counts.add(counts, fill_value=0)
+        return self
+
+    def _frame(self, df):
+        return df.sort_index().reset_index()
+
+    def sum(self):
+        return self._frame(self.sums)
+
+    def count(self):
+        return self._frame(self.counts)
+
+    def mean(self):
+        return self._frame(self.sums / self.counts)
+
+    def var(self, ddof=1):
+        """Variance per group as pandas var (NaN for groups with a single value)"""
+        var = (self.sumsq - self.sums ** 2 / self.counts) / (self.counts - ddof)
+        return self._frame(var.clip(lower=0).where(self.counts > ddof))
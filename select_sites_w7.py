@@ -0,0 +1,60 @@
+import os
+import multiprocessing
+import pandas as pd
+from select_w7 import load_sim_pfpr, score
+
+"""
+Joint parameter selection over several sites: every (site, DHS dataset, experiment) pair is scored as in select_w7.py
+in a pool of processes, the per-site log-likelihoods of each parameter set are summed into a joint log-likelihood
+and the parameter sets are ranked (rank 1 = best joint fit). Parameter sets missing at any site are not ranked.
+"""
+
+user = os.getlogin()  # user initials
+output_dir = os.path.join('simulation_outputs')
+data_dir = os.path.join('data')
+
+
+def score_site(site, sweep_variables):
+    sim_df = load_sim_pfpr(os.path.join(output_dir, site['expt_name'], 'U5_PfPR_ClinicalIncidence.csv'))
+    data_df = pd.read_csv(site['data'])
+    site_df = score(sim_df, data_df, sweep_variables)
+    site_df['site'] = site['site']
+    return site_df
+
+
+def _score_site(args):
+    return score_site(*args)
+
+
+def score_sites(sites, sweep_variables, cpus=None):
+    """Per-site scores (long format) and joint scores of all parameter sets (wide format, ranked)"""
+    cpus = min(cpus or os.cpu_count(), len(sites))
+    if cpus > 1:
+        with multiprocessing.Pool(cpus) as pool:
+            site_dfs = pool.map(_score_site, [(site, sweep_variables) for site in sites])
+    else:
+        site_dfs = [score_site(site, sweep_variables) for site in sites]
+    site_scores = pd.concat(site_dfs, ignore_index=True)
+
+    score_variables = [x for x in sweep_variables if x != 'Run_Number']
+    joint_df = site_scores.pivot_table(index=score_variables, columns='site', values='ll', dropna=False)
+    joint_df = joint_df[[site['site'] for site in sites]]
+    joint_df.columns = [f'll {x}' for x in joint_df.columns]
+    joint_df['joint_ll'] = joint_df.sum(axis=1, skipna=False)
+    joint_df['rank'] = joint_df['joint_ll'].rank(ascending=False, method='min')
+    joint_df = joint_df.reset_index().sort_values(by=['rank'] + score_variables, na_position='last')
+    return site_scores, joint_df.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # one row per site: name, (fake) DHS data and the experiment simulating the site
+    sites = [{'site': 'Namawala', 'data': os.path.join(data_dir, 'w7_fake_DHS.csv'),
+              'expt_name': f'{user}_FE_2022_example_w7'},
+             {'site': 'Ghana', 'data': os.path.join(data_dir, 'w7_fake_DHS_Ghana.csv'),
+              'expt_name': f'{user}_FE_2022_example_w7_Ghana'}]
+    sweep_variables = ['itn_coverage', 'Run_Number']
+
+    site_scores, joint_scores = score_sites(sites, sweep_variables)
+    print(joint_scores)
+    site_scores.to_csv(os.path.join(output_dir, 'site_scores.csv'), index=False)
+    joint_scores.to_csv(os.path.join(output_dir, 'joint_scores.csv'), index=False)
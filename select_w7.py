@@ -1,12 +1,14 @@
 import os
 
+import numpy as np
 import pandas as pd
 import matplotlib as mpl
 
 mpl.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
-from calibtool.LL_calculators import beta_binomial
+from scipy.special import gammaln
+from table_io import read_table
 
 user = os.getlogin()  # user initials
 expt_name = f'{user}_FE_2022_example_w7'
@@ -14,29 +16,57 @@ output_dir = os.path.join('simulation_outputs')
 input_dir = os.path.join('input')
 data_dir = os.path.join('data')
 
-sim_pfpr_df = pd.read_csv(os.path.join(output_dir, expt_name, 'U5_PfPR_ClinicalIncidence.csv'))
-sim_pfpr_df.columns = [col.replace(' U5', '') for col in sim_pfpr_df.columns]
-sim_pfpr_df['npos'] = sim_pfpr_df['PfPR'] * sim_pfpr_df['Pop']
-sim_pfpr_df['npos'] = sim_pfpr_df.npos.round(0)
-dhs_pfpr_df = pd.read_csv(os.path.join(data_dir, 'w7_fake_DHS.csv'))
-sweep_variables = ['itn_coverage', 'Run_Number']
 
-
-def score(sim_df, data_df, sweep_variables):
-    uniq_df = sim_df.groupby(sweep_variables).size().reset_index(name='Freq')
-    ll = []
-    for r, row in uniq_df.iterrows():
-        mask1 = sim_df[sweep_variables[0]] == row[sweep_variables[0]]
-        mask2 = sim_df[sweep_variables[1]] == row[sweep_variables[1]]
-        mask = mask1 & mask2
-        sim_subset_df = sim_df[mask]
-
-        comb_df = data_df.merge(sim_subset_df, on=['year', 'month'], how='left')
-        ll = ll + [beta_binomial(comb_df.DHS_n, comb_df.Pop, comb_df.DHS_pos, comb_df.npos)]
-
-    uniq_df['ll'] = ll
-
-    score_df = uniq_df.groupby(['itn_coverage'])['ll'].mean().reset_index(name='ll')
+def load_sim_pfpr(fname):
+    sim_df = read_table(fname)
+    sim_df.columns = [col.replace(' U5', '') for col in sim_df.columns]
+    sim_df['npos'] = sim_df['PfPR'] * sim_df['Pop']
+    sim_df['npos'] = sim_df.npos.round(0)
+    return sim_df
+
+
+def beta_binomial(data_n, sim_n, data_pos, sim_pos):
+    """Mean beta-binomial log-likelihood over the observations (last axis), as calibtool's beta_binomial,
+    for arrays of any shape, e.g. (parameter sets x observations)"""
+    ll = gammaln(data_n + 1) + gammaln(sim_pos + data_pos + 1) + gammaln(sim_n - sim_pos + data_n - data_pos + 1) + \
+         gammaln(sim_n + 2) - gammaln(data_pos + 1) - gammaln(data_n - data_pos + 1) - \
+         gammaln(sim_n + data_n + 2) - gammaln(sim_pos + 1) - gammaln(sim_n - sim_pos + 1)
+    return np.mean(ll, axis=-1)
+
+
+def score_runs(sim_df, data_df, sweep_variables, on=('year', 'month')):
+    """Log-likelihood of the data for every combination of sweep_variables (including Run_Number).
+    Simulated Pop and npos are aligned once into (parameter set x observation) arrays; observations
+    without simulated values give a NaN log-likelihood."""
+    on = list(on)
+    grouped = sim_df.groupby(sweep_variables)
+    uniq_df = grouped.size().reset_index(name='Freq')
+    sets = grouped.ngroup().values
+    if sim_df.duplicated(sweep_variables + on).any():
+        raise ValueError(f'Simulation output has several rows per {sweep_variables + on}')
+
+    # position of each data row and simulation row among the observed time points
+    keys = data_df[on].drop_duplicates().reset_index(drop=True)
+    keys['key'] = keys.index
+    data_key = data_df[on].merge(keys, on=on, how='left')['key'].values
+    sim_key = sim_df[on].merge(keys, on=on, how='left')['key'].values
+    observed = ~np.isnan(sim_key)
+
+    sim_n = np.full((len(uniq_df), len(keys)), np.nan)
+    sim_pos = np.full((len(uniq_df), len(keys)), np.nan)
+    sim_n[sets[observed], sim_key[observed].astype(int)] = sim_df['Pop'].values[observed]
+    sim_pos[sets[observed], sim_key[observed].astype(int)] = sim_df['npos'].values[observed]
+
+    uniq_df['ll'] = beta_binomial(data_df['DHS_n'].values, sim_n[:, data_key], data_df['DHS_pos'].values,
+                                  sim_pos[:, data_key])
+    return uniq_df
+
+
+def score(sim_df, data_df, sweep_variables, on=('year', 'month')):
+    """Mean log-likelihood over Run_Number of every combination of the other sweep_variables"""
+    uniq_df = score_runs(sim_df, data_df, sweep_variables, on)
+    score_variables = [x for x in sweep_variables if x != 'Run_Number']
+    score_df = uniq_df.groupby(score_variables)['ll'].mean().reset_index(name='ll')
     return score_df
 
 
@@ -70,6 +100,10 @@ def plot_output(sim_df, data_df, score_df, variable):
 
 
 if __name__ == "__main__":
+    sim_pfpr_df = load_sim_pfpr(os.path.join(output_dir, expt_name, 'U5_PfPR_ClinicalIncidence.csv'))
+    dhs_pfpr_df = pd.read_csv(os.path.join(data_dir, 'w7_fake_DHS.csv'))
+    sweep_variables = ['itn_coverage', 'Run_Number']
+
     scores = score(sim_pfpr_df, dhs_pfpr_df, sweep_variables)
     print(scores)
 
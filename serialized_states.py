@@ -0,0 +1,140 @@
+import os
+import re
+import sys
+import hashlib
+import numpy as np
+import pandas as pd
+from sim_calendar import DAYS_PER_YEAR
+from burnin_index import BurninIndex
+from table_io import write_table, read_table, table_exists
+
+"""
+Catalog of the serialized population files (state-<day>.dtk) of a burn-in experiment.
+The output folders of the burn-in simulations (see burnin_index.py) are scanned once, and every state file is recorded
+with its day, size, modification time and sha256 checksum in simulation_outputs/burnin_index/<burnin_id>_states.csv.
+Later scans only checksum files that are new or changed. Pick-up scripts can choose the available serialization day
+nearest to the day they want to pick up from, and report() summarizes missing, empty or truncated state files:
+
+    catalog = StateCatalog(BurninIndex(burnin_id))
+    pull_day = catalog.nearest_day(pull_year * 365, step=365)
+    cb.update_params({'Serialized_Population_Filenames': [day_filename(pull_day)]})
+
+Run `python serialized_states.py <burnin_id> [key tags]` for the report of a burn-in experiment.
+"""
+
+STATE_FILE = re.compile(r'^state-(\d+)\.dtk$')
+
+
+def file_checksum(path, chunk_size=1 << 22):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def scan_simulation(sim, known=None, checksum=True):
+    """Rows (sim_id, day, file, path, size, mtime_ns, checksum) of the state files of a burn-in simulation.
+    Checksums of files with the same size and mtime_ns as in known ({path: row}) are not recomputed."""
+    output = os.path.join(sim['path'], 'output')
+    if not os.path.isdir(output):
+        return []
+    rows = []
+    with os.scandir(output) as entries:
+        for entry in entries:
+            match = STATE_FILE.match(entry.name)
+            if match is None:
+                continue
+            stat = entry.stat()
+            row = {'sim_id': sim['sim_id'], 'day': int(match.group(1)), 'file': entry.name, 'path': entry.path,
+                   'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'checksum': None}
+            previous = (known or {}).get(entry.path)
+            if previous is not None and previous['size'] == row['size'] and previous['mtime_ns'] == row['mtime_ns']:
+                row['checksum'] = previous['checksum']
+            elif checksum:
+                row['checksum'] = file_checksum(entry.path)
+            rows.append(row)
+    return rows
+
+
+class StateCatalog:
+
+    def __init__(self, index, refresh=False, checksum=True, output_format='csv'):
+        self.index = index
+        self.checksum = checksum
+        self.output_format = output_format
+        self.fname = os.path.join(os.path.dirname(index.cache_file), f'{index.burnin_id}_states.csv')
+        if refresh or not table_exists(self.fname):
+            self.scan()
+        else:
+            self.df = read_table(self.fname)
+
+    def scan(self):
+        """(Re)scan the output folders of all burn-in simulations and write the catalog"""
+        known = {}
+        if table_exists(self.fname):
+            known = read_table(self.fname).set_index('path', drop=False).to_dict('index')
+        rows = []
+        for sim in self.index.simulations:
+            rows += scan_simulation(sim, known, self.checksum)
+        df = pd.DataFrame(rows, columns=['sim_id', 'day', 'file', 'path', 'size', 'mtime_ns', 'checksum'])
+        df['year'] = df['day'] / DAYS_PER_YEAR
+        df['modified'] = pd.to_datetime(df['mtime_ns'], unit='ns')
+        tags = pd.DataFrame([dict(sim_id=sim['sim_id'], **{k: sim['tags'][k] for k in self.index.key_tags})
+                             for sim in self.index.simulations], columns=['sim_id'] + self.index.key_tags)
+        self.df = df.merge(tags, on='sim_id', how='left').sort_values(['sim_id', 'day']).reset_index(drop=True)
+        write_table(self.df, self.fname, self.output_format)
+        return self
+
+    def days(self, sim_id=None):
+        """Serialization days available in simulation sim_id, or in all burn-in simulations"""
+        if sim_id is not None:
+            return sorted(self.df.loc[self.df['sim_id'] == sim_id, 'day'].unique())
+        sims_per_day = self.df.groupby('day')['sim_id'].nunique()
+        return sorted(sims_per_day.index[sims_per_day == len(self.index.simulations)])
+
+    def nearest_day(self, day, sim_id=None, before=False, step=1):
+        """Available serialization day nearest to day (the latest one not after day if before=True), among the days
+        that are multiples of step (e.g. 365 for year ends)"""
+        days = np.array(self.days(sim_id))
+        days = days[days % step == 0]
+        if before:
+            days = days[days <= day]
+        if len(days) == 0:
+            where = f'simulation {sim_id}' if sim_id is not None else 'all simulations'
+            raise FileNotFoundError(f'No serialized state available for {where} of {self.index.burnin_id}')
+        nearest = int(days[np.abs(days - day).argmin()])
+        if nearest != day:
+            print(f'\nWarning: no state file for day {day}, using day {nearest}')
+        return nearest
+
+    def report(self):
+        """Per serialization day: simulations with/without a state file, sizes, empty and truncated files
+        (smaller than half of the median size of the day) and files without checksum"""
+        df = self.df
+        median = df.groupby('day')['size'].transform('median')
+        df = df.assign(empty=df['size'] == 0, truncated=(df['size'] > 0) & (df['size'] < median / 2),
+                       unchecked=df['checksum'].isna())
+        report = df.groupby('day').agg(simulations=('sim_id', 'nunique'), total_size=('size', 'sum'),
+                                       min_size=('size', 'min'), median_size=('size', 'median'),
+                                       max_size=('size', 'max'), empty=('empty', 'sum'),
+                                       truncated=('truncated', 'sum'), unchecked=('unchecked', 'sum'))
+        report.insert(1, 'missing', len(self.index.simulations) - report['simulations'])
+        return report.reset_index()
+
+    def verify(self):
+        """State files whose checksum changed (or that disappeared) since they were cataloged"""
+        changed = []
+        for _, row in self.df.iterrows():
+            if not os.path.exists(row['path']):
+                changed.append(row['path'])
+            elif not pd.isna(row['checksum']) and file_checksum(row['path']) != row['checksum']:
+                changed.append(row['path'])
+        return changed
+
+
+if __name__ == "__main__":
+    # burn-in experiment id, optionally followed by the tags identifying its simulations (default Run_Number)
+    key_tags = sys.argv[2:] or ['Run_Number']
+    catalog = StateCatalog(BurninIndex(sys.argv[1], key_tags=key_tags), refresh=True)
+    print(catalog.report().to_string(index=False))
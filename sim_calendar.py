@@ -0,0 +1,60 @@
+import datetime
+import numpy as np
+
+"""
+Simulation calendar helpers shared by the analyzers in analyzer_collection.py.
+EMOD reports simulation time in days with 365-day years (no leap years), so day-of-year, month and year
+can be read from precomputed lookup tables instead of parsing dates row by row.
+"""
+
+DAYS_PER_YEAR = 365
+
+# month (1-12) of every day index 0-364 of a 365-day year, day index 0 being January 1st
+MONTH_OF_DAY = np.array([(datetime.date(2021, 1, 1) + datetime.timedelta(d)).month for d in range(DAYS_PER_YEAR)])
+
+
+def day_of_year(time):
+    """Day index 0-364 of the simulation year (same as Time % 365)"""
+    return np.asarray(time) % DAYS_PER_YEAR
+
+
+def month_of_day(day):
+    """Month 1-12 of a day index 0-364, equivalent to monthparser((day + 1) % 365)"""
+    return MONTH_OF_DAY[np.asarray(day).astype(int)]
+
+
+def year_of_time(time, start_year):
+    """Calendar year of a simulation time, same as int(time / 365) + start_year for time >= 0"""
+    return (np.asarray(time) // DAYS_PER_YEAR).astype(int) + start_year
+
+
+def month_start_date(year, month):
+    """First day of the month as datetime64[D], equivalent to datetime.date(year, month, 1)"""
+    months = (np.asarray(year).astype(int) - 1970) * 12 + np.asarray(month).astype(int) - 1
+    return months.astype('datetime64[M]').astype('datetime64[D]')
+
+
+def day_date(year, day):
+    """Date as datetime64[D], equivalent to datetime.date(year, 1, 1) + datetime.timedelta(day - 1)"""
+    year_start = (np.asarray(year).astype(int) - 1970).astype('datetime64[Y]').astype('datetime64[D]')
+    return year_start + (np.asarray(day).astype(int) - 1).astype('timedelta64[D]')
+
+
+def add_calendar_columns(df, start_year, time_col='Time', day_col='Day', month_col='Month', year_col='Year',
+                         date=None):
+    """Add day, month and year columns derived from time_col to df (in place).
+    date='day' adds the daily date used by the InsetChart analyzers, date='month' the first day of the month.
+    Set month_col=None to skip the month column."""
+    time = df[time_col].values
+    day = day_of_year(time)
+    year = year_of_time(time, start_year)
+    df[day_col] = day
+    if month_col is not None:
+        df[month_col] = month_of_day(day)
+    df[year_col] = year
+    if date == 'day':
+        df['date'] = day_date(year, day)
+    elif date == 'month':
+        df['date'] = month_start_date(year, month_of_day(day))
+    return df
+
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+"""
+MalariaSummaryReport reader shared by the summary report analyzers in analyzer_collection.py.
+Each 'DataByTimeAndAgeBins' channel is converted once into a (time x agebin) array and all age bins, reports
+(e.g. one report per year) and channels are emitted in long format with a single reshape.
+"""
+
+AGEBIN_CHANNELS = {'PfPR': 'PfPR by Age Bin',
+                   'Cases': 'Annual Clinical Incidence by Age Bin',
+                   'Severe cases': 'Annual Severe Incidence by Age Bin',
+                   'Mild anaemia': 'Annual Mild Anemia by Age Bin',
+                   'Moderate anaemia': 'Annual Moderate Anemia by Age Bin',
+                   'Severe anaemia': 'Annual Severe Anemia by Age Bin',
+                   'New infections': 'New Infections by Age Bin',
+                   'Mean Log Parasite Density': 'Mean Log Parasite Density by Age Bin',
+                   'Pop': 'Average Population by Age Bin'}
+
+
+def agebin_array(report, channel, n_time, bins=None):
+    """(time x agebin) array of a 'DataByTimeAndAgeBins' channel, truncated to n_time rows"""
+    arr = np.asarray(report['DataByTimeAndAgeBins'][channel][:n_time], dtype=float)
+    if bins is not None:
+        arr = arr[:, bins]
+    return arr
+
+
+def summary_report_frame(reports, channels, n_time, time_col, time_values, report_col=None, report_values=None,
+                         time_channels=None, bins=None, agebin_col='agebin'):
+    """Long-format frame of one or several parsed summary reports.
+
+    channels maps output column names to 'DataByTimeAndAgeBins' channels and time_channels maps output column names
+    to 'DataByTime' channels (repeated for every age bin). Rows are ordered by report, age bin and time step.
+    Columns are time_col, channels, time_channels, report_col (set to report_values) and agebin_col."""
+    age_bins = np.asarray(reports[0]['Metadata']['Age Bins'])
+    if bins is None:
+        bins = list(range(len(age_bins)))
+    n_reports, n_bins = len(reports), len(bins)
+
+    simdata = {time_col: np.tile(np.asarray(time_values), n_reports * n_bins)}
+    for col, channel in channels.items():
+        # (report x time x agebin) -> (report x agebin x time)
+        arr = np.stack([agebin_array(report, channel, n_time, bins) for report in reports])
+        simdata[col] = arr.transpose(0, 2, 1).ravel()
+    for col, channel in (time_channels or {}).items():
+        arr = np.stack([np.asarray(report['DataByTime'][channel][:n_time], dtype=float) for report in reports])
+        simdata[col] = np.repeat(arr[:, np.newaxis, :], n_bins, axis=1).ravel()
+    if report_col is not None:
+        simdata[report_col] = np.repeat(np.asarray(report_values), n_bins * n_time)
+    if agebin_col is not None:
+        simdata[agebin_col] = np.tile(np.repeat(age_bins[bins], n_time), n_reports)
+    return pd.DataFrame(simdata)
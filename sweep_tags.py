@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+"""
+Sweep variable tagging shared by the analyzers in analyzer_collection.py.
+Every simulation result is tagged with the values of its sweep variables (simulation tags). String tags
+(and list tags, joined with '-') are stored as categoricals holding a single category instead of one Python
+string per row, numeric tags keep their numeric dtype. concat_tagged concatenates the results of all simulations
+keeping these columns categorical, so the combined frame stores one small integer code per row.
+"""
+
+
+def tag_value(value):
+    if isinstance(value, (list, tuple)):
+        return '-'.join([str(x) for x in value])
+    return value
+
+
+def add_sweep_tags(df, simulation, sweep_variables):
+    """Add a column per sweep variable to df (in place), Run_Number defaults to 0 if not a tag"""
+    for sweep_var in sweep_variables:
+        if sweep_var in simulation.tags.keys():
+            value = tag_value(simulation.tags[sweep_var])
+        elif sweep_var == 'Run_Number':
+            value = 0
+        else:
+            continue
+        if isinstance(value, str):
+            df[sweep_var] = pd.Categorical.from_codes(np.zeros(len(df), dtype='int8'), categories=[value])
+        else:
+            df[sweep_var] = value
+    return df
+
+
+def concat_tagged(frames, **kwargs):
+    """pd.concat of tagged frames, with categorical columns combined into one categorical column
+    (pd.concat would fall back to object columns for categoricals with different categories)"""
+    frames = list(frames)
+    columns = set([col for df in frames for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)])
+    for col in columns:
+        if not all(col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype) for df in frames):
+            continue
+        # sorted categories, so that groupby orders rows as for the string values
+        categories = union_categoricals([df[col] for df in frames], sort_categories=True).categories
+        frames = [df.assign(**{col: df[col].cat.set_categories(categories)}) for df in frames]
+    return pd.concat(frames, **kwargs)
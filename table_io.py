@@ -0,0 +1,73 @@
+import os
+import pandas as pd
+from experiment_store import ExperimentStore
+
+"""
+Readers and writers for the tables written by the analyzers in analyzer_collection.py.
+Besides csv, outputs can be written as typed columnar files (parquet or feather, both requiring pyarrow) with
+dates stored as datetime64 and sweep variables as categoricals, which are smaller and much faster to reload.
+Analyzer outputs keep their csv file name with the extension of the selected output format.
+"""
+
+OUTPUT_FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+
+
+def table_path(fname, output_format):
+    return os.path.splitext(fname)[0] + OUTPUT_FORMATS[output_format]
+
+
+def parse_dates(df, columns=('date',)):
+    for col in [x for x in columns if x in df.columns]:
+        try:
+            df[col] = pd.to_datetime(df[col])
+        except (ValueError, TypeError, OverflowError):  # e.g. year 0 dates of simulations without start_year
+            pass
+    return df
+
+
+def typed_table(df, categorical_columns=None):
+    """df with dates as datetime64 and categorical_columns as categoricals"""
+    df = parse_dates(df.reset_index(drop=True))
+    for col in [x for x in categorical_columns or [] if x in df.columns]:
+        df[col] = df[col].astype('category')
+    return df
+
+
+def write_table(df, fname, output_format='csv', categorical_columns=None, store=False):
+    """Write df to fname (csv file name) in output_format and return the path written.
+    With store=True df is also written to the experiment store of the output folder (experiment_store.py)."""
+    if store:
+        ExperimentStore(os.path.dirname(fname)).write_report(os.path.splitext(os.path.basename(fname))[0],
+                                                             typed_table(df, categorical_columns))
+    if output_format == 'csv':
+        df.to_csv(fname, index=False)
+        return fname
+
+    df = typed_table(df, categorical_columns)
+    path = table_path(fname, output_format)
+    if output_format == 'parquet':
+        df.to_parquet(path, index=False)
+    elif output_format == 'feather':
+        df.to_feather(path)
+    else:
+        raise ValueError(f'Unknown output format {output_format}, use one of {list(OUTPUT_FORMATS.keys())}')
+    return path
+
+
+def table_exists(fname):
+    return any(os.path.exists(table_path(fname, x)) for x in OUTPUT_FORMATS.keys())
+
+
+def read_table(fname, columns=None):
+    """Read an analyzer output written by write_table in any output format, fname being its csv file name.
+    If several formats exist, the most recently written file is used. Dates are returned as datetime64."""
+    paths = [table_path(fname, x) for x in OUTPUT_FORMATS.keys() if os.path.exists(table_path(fname, x))]
+    if len(paths) == 0:
+        raise FileNotFoundError(f'No analyzer output found for {fname}')
+    path = max(paths, key=os.path.getmtime)
+
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns)
+    if path.endswith('.feather'):
+        return pd.read_feather(path, columns=columns)
+    return parse_dates(pd.read_csv(path, usecols=columns))